@@ -1,8 +1,45 @@
+import asyncio
+from typing import Optional
 from app.services.vector_store import VectorStore
-from app.core.vector_store_singleton import get_vector_store
+from app.services.assessment_service import SecurityAssessmentService
+from app.services.embeddings_service import EmbeddingsService, EmbeddingBatcher, get_shared_embeddings_service
+from app.core import vector_store_singleton
+from app.core.config import settings
 
 # Removed all database session management code. Only vector store dependency remains.
 
+# Shared assessment service, initialized once per process
+_assessment_service: Optional[SecurityAssessmentService] = None
+_assessment_service_lock = asyncio.Lock()
+
+# Concurrent search queries share a single batched model call
+_query_batcher = EmbeddingBatcher(
+    get_shared_embeddings_service(),
+    max_batch=settings.EMBEDDING_BATCH_MAX_SIZE,
+    max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS
+)
+
 def get_vector_store() -> VectorStore:
     """Dependency for getting VectorStore instance"""
-    return get_vector_store() 
\ No newline at end of file
+    # Read the module attribute directly: the store is created by init_vector_store()
+    # at startup, so binding it at import time would capture None.
+    return vector_store_singleton.vector_store
+
+async def get_assessment_service() -> SecurityAssessmentService:
+    """Dependency for getting the shared, initialized SecurityAssessmentService"""
+    global _assessment_service
+    if _assessment_service is None:
+        async with _assessment_service_lock:
+            if _assessment_service is None:
+                service = SecurityAssessmentService()
+                await service.initialize()
+                _assessment_service = service
+    return _assessment_service
+
+def get_embedding_service() -> EmbeddingsService:
+    """Dependency for getting the shared EmbeddingsService instance"""
+    return get_shared_embeddings_service()
+
+def get_query_batcher() -> EmbeddingBatcher:
+    """Dependency for getting the shared query embedding batcher"""
+    return _query_batcher
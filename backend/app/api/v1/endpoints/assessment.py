@@ -1,48 +1,67 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends
 from app.schemas.assessment_input import SecurityAssessmentInput
-from app.schemas.assessment import SecurityAssessmentResult, SecurityScore
+from app.schemas.assessment import SecurityAssessmentResult, SecurityScore, SEVERITY_CODES, UNKNOWN_SEVERITY_CODE
 from app.services.assessment_service import SecurityAssessmentService
+from app.api.dependencies import get_assessment_service, get_vector_store, get_query_batcher
 from app.core.exceptions import AssessmentError, ValidationError
 from app.core.rate_limiter import rate_limit, is_redis_configured
 from app.core.config import settings
-from app.core.vector_store_singleton import get_vector_store
+from app.core.semantic_cache import SemanticCache
+from app.core.responses import ORJSONResponse
 from app.services.vector_store import VectorStore
+from app.services.embeddings_service import EmbeddingBatcher
 import logging
-from typing import List, Dict, Any
+import time
+from collections import OrderedDict
+from operator import attrgetter
+from typing import Dict, Any
 from datetime import datetime
 import numpy as np
 
 logger = logging.getLogger(__name__)
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
-def _to_python_types(obj):
-    """Recursively convert numpy and Pydantic types to Python-native types for JSON serialization."""
-    if isinstance(obj, dict):
-        return {str(_to_python_types(k)): _to_python_types(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [_to_python_types(i) for i in obj]
-    elif hasattr(obj, 'dict'):
-        return _to_python_types(obj.dict())
-    elif isinstance(obj, np.generic):
-        return obj.item()
-    elif isinstance(obj, (np.bool_, bool)):
-        return bool(obj)
-    elif isinstance(obj, (np.integer, int)):
-        return int(obj)
-    elif isinstance(obj, (np.floating, float)):
-        return float(obj)
-    elif hasattr(obj, 'value'):
-        return str(obj.value)
-    return obj
+# Optional semantic cache so paraphrased search queries reuse earlier results: (expires_at, results).
+# Entries expire after CACHE_TTL so findings stored since are picked up by later searches.
+_search_cache = SemanticCache(
+    dim=VectorStore.VECTOR_SIZE,
+    capacity=settings.SEMANTIC_CACHE_SIZE,
+    threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+    quantize=settings.SEMANTIC_CACHE_QUANTIZE
+) if settings.SEMANTIC_CACHE_ENABLED and settings.SEMANTIC_CACHE_SIZE > 0 else None
+
+# Exact-match LRU of query embeddings (vectors are read-only once cached)
+_QUERY_EMBEDDING_CACHE_SIZE = 1024
+_query_embedding_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+async def _embed_query(query_text: str, batcher: EmbeddingBatcher) -> np.ndarray:
+    """Embed a search query, reusing vectors for repeated queries"""
+    embedding = _query_embedding_cache.get(query_text)
+    if embedding is not None:
+        _query_embedding_cache.move_to_end(query_text)
+        return embedding
+
+    embedding = await batcher.embed_coalesced(query_text)
+    embedding.flags.writeable = False
+    _query_embedding_cache[query_text] = embedding
+    if len(_query_embedding_cache) > _QUERY_EMBEDDING_CACHE_SIZE:
+        _query_embedding_cache.popitem(last=False)
+    return embedding
+
+# Only the four main categories are reported to the frontend
+_MAIN_CATEGORIES = ("API_SECURITY", "PROMPT_SECURITY", "CONFIGURATION", "ERROR_HANDLING")
+
+# Finding fields reported to the frontend, fetched in one attrgetter call
+_FINDING_KEYS = ("id", "category", "severity", "title", "description", "recommendation", "code_snippets", "validation_info")
+_finding_fields = attrgetter(*_FINDING_KEYS)
 
 def _transform_assessment_result(result: SecurityAssessmentResult) -> Dict[str, Any]:
     """Transform backend assessment result to frontend format"""
-    # Only include the four main categories
-    main_categories = ["API_SECURITY", "PROMPT_SECURITY", "CONFIGURATION", "ERROR_HANDLING"]
+    scores_by_category = result.category_scores
     category_scores = {}
-    for cat in main_categories:
-        score_obj = result.category_scores.get(cat)
-        if score_obj:
+    for cat in _MAIN_CATEGORIES:
+        score_obj = scores_by_category.get(cat)
+        if score_obj is not None:
             category_scores[cat] = {
                 "score": score_obj.score,
                 "findings": score_obj.findings,
@@ -54,31 +73,22 @@ def _transform_assessment_result(result: SecurityAssessmentResult) -> Dict[str,
     # Use the precomputed overall_score
     overall_score = result.overall_score
 
-    # Order findings by severity and confidence
-    severity_order = {"CRITICAL": 0, "HIGH": 1, "MEDIUM": 2, "LOW": 3}
-    ordered_vulnerabilities = sorted(
-        result.vulnerabilities,
-        key=lambda f: (severity_order.get(f.severity.upper(), 4), -f.confidence)
-    )
+    # Order findings by severity and confidence using integer severity codes
+    vulnerabilities = result.vulnerabilities
+    severity_codes = np.fromiter((f.severity_code for f in vulnerabilities), dtype=np.int8, count=len(vulnerabilities))
+    confidences = np.fromiter((f.confidence for f in vulnerabilities), dtype=np.float64, count=len(vulnerabilities))
+    order = np.lexsort((-confidences, severity_codes))
+    severity_counts = np.bincount(severity_codes, minlength=UNKNOWN_SEVERITY_CODE + 1)
 
-    findings = []
-    for finding in ordered_vulnerabilities:
-        findings.append({
-            "id": finding.id,
-            "category": finding.category,
-            "severity": finding.severity.upper(),
-            "title": finding.title,
-            "description": finding.description,
-            "recommendation": finding.recommendation,
-            "code_snippets": finding.code_snippets,
-            "validation_info": finding.validation_info
-        })
+    findings = [dict(zip(_FINDING_KEYS, _finding_fields(vulnerabilities[idx]))) for idx in order]
+    for finding in findings:
+        finding["severity"] = finding["severity"].upper()
 
     # Create a summary based on findings
     summary = f"Security assessment for {result.project_name} completed with {len(findings)} findings."
     if findings:
-        critical_count = sum(1 for f in findings if f["severity"] == "CRITICAL")
-        high_count = sum(1 for f in findings if f["severity"] == "HIGH")
+        critical_count = int(severity_counts[SEVERITY_CODES["CRITICAL"]])
+        high_count = int(severity_counts[SEVERITY_CODES["HIGH"]])
         summary += f" Found {critical_count} critical and {high_count} high severity issues."
 
     return {
@@ -95,11 +105,11 @@ def _transform_assessment_result(result: SecurityAssessmentResult) -> Dict[str,
         "token_usage": result.token_usage
     }
 
-@router.post("/assess", response_model=Dict[str, Any])
+@router.post("/assess", response_model=None)
 async def assess_security(
     input_data: SecurityAssessmentInput,
-    background_tasks: BackgroundTasks,
     vector_store: VectorStore = Depends(get_vector_store),
+    service: SecurityAssessmentService = Depends(get_assessment_service),
     _: None = rate_limit(requests=5, period=60) if settings.ENVIRONMENT == "production" and is_redis_configured() else None
 ):
     """
@@ -113,19 +123,18 @@ async def assess_security(
     3. Stores the assessment results in the database and vector store
     4. Returns the complete assessment result
     """
-    from app.services.assessment_service import SecurityAssessmentService
-    service = SecurityAssessmentService()
-    await service.initialize()
     result = await service.analyze_input(input_data)
     transformed_result = _transform_assessment_result(result)
     # Store in vector store if needed (no DB)
     logger.info(f"Assessment completed for {input_data.organization_name}/{input_data.project_name} (no DB storage)")
-    return transformed_result
+    # Return the response directly so FastAPI skips validation and jsonable_encoder
+    return ORJSONResponse(content=transformed_result)
 
-@router.post("/search/similar", response_model=List[Dict[str, Any]])
+@router.post("/search/similar", response_model=None)
 async def search_similar_findings(
     query: Dict[str, str],
     vector_store: VectorStore = Depends(get_vector_store),
+    batcher: EmbeddingBatcher = Depends(get_query_batcher),
     _: None = rate_limit(requests=20, period=60) if is_redis_configured() else None  # 20 requests per minute
 ):
     """
@@ -147,12 +156,15 @@ async def search_similar_findings(
         if not query_text:
             raise HTTPException(status_code=400, detail="Query text is required")
             
-        # Initialize embedding service
-        from app.services.embeddings_service import EmbeddingsService
-        embedding_service = EmbeddingsService()
+        # Generate embedding for query, batched with any concurrent queries
+        query_embedding = await _embed_query(query_text, batcher)
         
-        # Generate embedding for query
-        query_embedding = embedding_service.get_embedding(query_text)
+        # Serve near-duplicate queries from the semantic cache
+        if _search_cache is not None:
+            entry = _search_cache.get(query_embedding)
+            if entry is not None and entry[0] >= time.monotonic():
+                logger.info(f"Semantic cache hit for query: {query_text}")
+                return ORJSONResponse(content=entry[1])
         
         # Search for similar documents
         results = await vector_store.search_similar(
@@ -175,8 +187,11 @@ async def search_similar_findings(
                 "created_at": result["created_at"].isoformat()
             })
         
+        if _search_cache is not None:
+            _search_cache.put(query_embedding, (time.monotonic() + settings.CACHE_TTL, transformed_results))
+        
         logger.info(f"Found {len(transformed_results)} similar findings for query: {query_text}")
-        return transformed_results
+        return ORJSONResponse(content=transformed_results)
         
     except Exception as e:
         logger.error(f"Error searching for similar findings: {str(e)}", exc_info=True)
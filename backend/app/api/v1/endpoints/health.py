@@ -1,28 +1,27 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+import orjson
 from app.core.config import settings
 
 router = APIRouter()
 
+# The stateless health payload never changes at runtime, so render it once
+_HEALTH_BYTES = orjson.dumps({
+    "status": "healthy",
+    "version": getattr(settings, "VERSION", "unknown"),
+    "environment": getattr(settings, "ENVIRONMENT", "production"),
+    "database": "not_configured"
+})
+
 @router.get("/")
 async def health_root():
     """
     Stateless health check endpoint for Railway deployment at /api/v1/health
     """
-    return {
-        "status": "healthy",
-        "version": getattr(settings, "VERSION", "unknown"),
-        "environment": getattr(settings, "ENVIRONMENT", "production"),
-        "database": "not_configured"
-    }
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
 
 @router.get("/health")
 async def health_check():
     """
     Stateless health check endpoint for Railway deployment
     """
-    return {
-        "status": "healthy",
-        "version": getattr(settings, "VERSION", "unknown"),
-        "environment": getattr(settings, "ENVIRONMENT", "production"),
-        "database": "not_configured"
-    } 
\ No newline at end of file
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
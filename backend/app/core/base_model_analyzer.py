@@ -5,29 +5,182 @@ This module provides functionality to analyze code and configurations using
 a large language model directly, with results parsed into structured findings.
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
+from collections import OrderedDict
+import asyncio
+from contextvars import ContextVar
 import os
 import logging
-import json
+import orjson
 import re
-from openai import AsyncOpenAI
+import time
+import hashlib
+import io
+from types import MappingProxyType
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 from app.schemas.assessment import VulnerabilityFinding
+from app.core.config import settings
+from app.core.semantic_cache import SemanticCache
+from app.services.embeddings_service import get_shared_embeddings_service
 
 logger = logging.getLogger(__name__)
 
+# JSON array of finding objects embedded in a non-JSON response
+_JSON_ARRAY_RE = re.compile(r'(\[\s*\{.*\}\s*\])', re.DOTALL)
+
+# Map of category keywords to standard categories (checked in order)
+_CATEGORY_MAP = MappingProxyType({
+    'API': 'API_SECURITY',
+    'API_SECURITY': 'API_SECURITY',
+    'PROMPT': 'PROMPT_SECURITY',
+    'PROMPT_INJECTION': 'PROMPT_SECURITY',
+    'PROMPT_SECURITY': 'PROMPT_SECURITY',
+    'CONFIG': 'CONFIGURATION',
+    'CONFIGURATION': 'CONFIGURATION',
+    'ERROR': 'ERROR_HANDLING',
+    'ERROR_HANDLING': 'ERROR_HANDLING'
+})
+
+# Upper bound on completion tokens requested per analysis call
+_MAX_COMPLETION_TOKENS = 2000
+
+# The embedding model truncates input at 256 word pieces, so longer prompts
+# would be matched on their prefix alone and are never semantically cached
+_SEMANTIC_CACHE_MAX_CHARS = 1000
+
+# Token usage of the assessment being served. The service sets a fresh dict per request;
+# analysis tasks inherit a copy of the context that points at that same dict.
+request_token_usage: ContextVar[Optional[Dict[str, int]]] = ContextVar("request_token_usage", default=None)
+
+class _RequestThrottle:
+    """Token-bucket limiter for requests and tokens per minute; a limit of 0 or less means unlimited"""
+    
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._available_requests = float(max(requests_per_minute, 0))
+        self._available_tokens = float(max(tokens_per_minute, 0))
+        self._last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self) -> None:
+        """Replenish both buckets in proportion to the time elapsed"""
+        now = time.monotonic()
+        elapsed_minutes = (now - self._last_refill) / 60.0
+        self._last_refill = now
+        if self.requests_per_minute > 0:
+            self._available_requests = min(self.requests_per_minute, self._available_requests + elapsed_minutes * self.requests_per_minute)
+        if self.tokens_per_minute > 0:
+            self._available_tokens = min(self.tokens_per_minute, self._available_tokens + elapsed_minutes * self.tokens_per_minute)
+    
+    async def acquire(self, tokens: int) -> None:
+        """Wait until one request and the given number of tokens fit in the budget"""
+        limit_requests = self.requests_per_minute > 0
+        limit_tokens = self.tokens_per_minute > 0
+        if not limit_requests and not limit_tokens:
+            return
+        # A single oversized request may use the whole token budget but never blocks forever
+        tokens = min(tokens, self.tokens_per_minute) if limit_tokens else 0
+        needed_requests = 1 if limit_requests else 0
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._available_requests >= needed_requests and self._available_tokens >= tokens:
+                    self._available_requests -= needed_requests
+                    self._available_tokens -= tokens
+                    return
+                wait_minutes = max(
+                    (needed_requests - self._available_requests) / self.requests_per_minute if limit_requests else 0.0,
+                    (tokens - self._available_tokens) / self.tokens_per_minute if limit_tokens else 0.0
+                )
+                await asyncio.sleep(wait_minutes * 60.0)
+
 class BaseModelAnalyzer:
     """Analyzes code and configurations using LLM for AI security vulnerabilities"""
     
     def __init__(self):
         """Initialize with OpenAI client"""
-        # Use timeout to prevent hanging API calls
+        # Use timeout to prevent hanging API calls; the SDK retries 429/5xx with exponential backoff
+        self.max_concurrent_requests = settings.LLM_MAX_CONCURRENT_REQUESTS
         self.client = AsyncOpenAI(
             api_key=os.getenv("OPENAI_API_KEY"),
-            timeout=60.0  # 60 second timeout for API calls
+            timeout=60.0,  # 60 second timeout for API calls
+            max_retries=max(0, settings.LLM_MAX_ATTEMPTS - 1),
+            # SDK default client (its timeouts, redirects and transport), sized to our concurrency
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrent_requests,
+                    max_keepalive_connections=self.max_concurrent_requests
+                )
+            )
         )
         # Default to faster model if not specified
         self.model = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
         self.token_usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        
+        # Exact-match cache of raw LLM responses keyed by prompt hash: (expires_at, response_text)
+        self._response_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.response_cache_ttl = settings.CACHE_TTL
+        self.response_cache_size = settings.LLM_RESPONSE_CACHE_SIZE
+        
+        # Optional similarity-keyed cache of responses: (system_prompt, expires_at, response_text)
+        self._semantic_cache = SemanticCache(
+            dim=get_shared_embeddings_service().dimensions,
+            capacity=self.response_cache_size,
+            threshold=settings.LLM_SEMANTIC_CACHE_THRESHOLD
+        ) if settings.LLM_SEMANTIC_CACHE_ENABLED and self.response_cache_size > 0 else None
+        
+        # Bound in-flight completions and stay under the account's rate limits
+        self._request_semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        self._throttle = _RequestThrottle(settings.LLM_MAX_REQUESTS_PER_MINUTE, settings.LLM_MAX_TOKENS_PER_MINUTE)
+    
+    def _response_cache_key(self, system_prompt: str, user_prompt: str) -> str:
+        """Hash the model and prompts into a cache key"""
+        return hashlib.sha256(f"{self.model}\0{system_prompt}\0{user_prompt}".encode()).hexdigest()
+    
+    def _get_cached_response(self, key: str) -> Optional[str]:
+        """Return a cached response text if present and not expired"""
+        entry = self._response_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, response_text = entry
+        if expires_at < time.monotonic():
+            del self._response_cache[key]
+            return None
+        self._response_cache.move_to_end(key)
+        return response_text
+    
+    def _cache_response(self, key: str, response_text: str) -> None:
+        """Store a response text, evicting the least recently used entry when full"""
+        if self.response_cache_size <= 0:
+            return
+        self._response_cache[key] = (time.monotonic() + self.response_cache_ttl, response_text)
+        self._response_cache.move_to_end(key)
+        while len(self._response_cache) > self.response_cache_size:
+            self._response_cache.popitem(last=False)
+    
+    async def _embed_prompt(self, user_prompt: str) -> Optional[List[float]]:
+        """Embed a short prompt for semantic cache lookups, or None if it cannot be cached"""
+        if self._semantic_cache is None or len(user_prompt) > _SEMANTIC_CACHE_MAX_CHARS:
+            return None
+        try:
+            return await get_shared_embeddings_service().generate_embedding(user_prompt, use_cache=False)
+        except Exception as e:
+            logger.warning(f"Could not embed prompt for semantic cache: {str(e)}")
+            return None
+    
+    def _get_similar_response(self, system_prompt: str, embedding: Optional[List[float]]) -> Optional[str]:
+        """Return the cached response for a near-identical prompt, if present and not expired"""
+        if embedding is None:
+            return None
+        entry = self._semantic_cache.get(embedding)
+        if entry is None:
+            return None
+        cached_system_prompt, expires_at, response_text = entry
+        if cached_system_prompt != system_prompt or expires_at < time.monotonic():
+            return None
+        return response_text
     
     async def analyze_code(self, code: str, context: str) -> List[VulnerabilityFinding]:
         """Analyze code for AI security vulnerabilities using the base model"""
@@ -45,6 +198,10 @@ class BaseModelAnalyzer:
         
         return await self._analyze_with_llm(system_prompt, user_prompt)
     
+    async def analyze_code_batch(self, items: List[Tuple[str, str]]) -> List[List[VulnerabilityFinding]]:
+        """Analyze (code, context) pairs concurrently, returning findings in input order"""
+        return await asyncio.gather(*(self.analyze_code(code, context) for code, context in items))
+    
     async def analyze_config(self, config: str) -> List[VulnerabilityFinding]:
         """Analyze configuration for AI security vulnerabilities using the base model"""
         findings = []
@@ -65,6 +222,46 @@ class BaseModelAnalyzer:
     
     async def _analyze_with_llm(self, system_prompt: str, user_prompt: str) -> List[VulnerabilityFinding]:
         """Helper method that handles the actual LLM call and parsing logic"""
+        # Identical prompts reuse the earlier response instead of calling the LLM again
+        cache_key = self._response_cache_key(system_prompt, user_prompt)
+        cached_text = self._get_cached_response(cache_key)
+        if cached_text is not None:
+            logger.info("Using cached LLM response")
+            return self._parse_findings(cached_text)
+        
+        # Near-identical prompts reuse the response of the closest earlier prompt
+        prompt_embedding = await self._embed_prompt(user_prompt)
+        similar_text = self._get_similar_response(system_prompt, prompt_embedding)
+        if similar_text is not None:
+            logger.info("Using semantically cached LLM response")
+            return self._parse_findings(similar_text)
+        
+        # Estimate prompt tokens from length and reserve the full completion budget
+        estimated_tokens = len(system_prompt + user_prompt) // 4 + _MAX_COMPLETION_TOKENS
+        async with self._request_semaphore:
+            await self._throttle.acquire(estimated_tokens)
+            response_text, complete = await self._request_completion(system_prompt, user_prompt)
+        
+        if not response_text:
+            return []
+        
+        try:
+            # Parse findings; only complete responses are worth caching
+            findings = self._parse_findings(response_text)
+            if complete:
+                self._cache_response(cache_key, response_text)
+                if prompt_embedding is not None:
+                    self._semantic_cache.put(
+                        prompt_embedding,
+                        (system_prompt, time.monotonic() + self.response_cache_ttl, response_text)
+                    )
+            return findings
+        except Exception as e:
+            logger.error(f"Error in base model analysis: {str(e)}")
+            return []
+    
+    async def _request_completion(self, system_prompt: str, user_prompt: str) -> Tuple[Optional[str], bool]:
+        """Request a completion from the LLM, returning its text and whether the call completed"""
         try:
             # Try with response_format first (with streaming for faster response)
             try:
@@ -75,23 +272,29 @@ class BaseModelAnalyzer:
                         {"role": "user", "content": user_prompt}
                     ],
                     temperature=0.1,  # Reduced temperature for faster, more consistent responses
-                    max_tokens=2000,  # Set a reasonable limit to avoid excessive generation
+                    max_tokens=_MAX_COMPLETION_TOKENS,  # Set a reasonable limit to avoid excessive generation
                     response_format={"type": "json_object"},
-                    stream=True  # Enable streaming for faster time-to-first-token
+                    stream=True,  # Enable streaming for faster time-to-first-token
+                    stream_options={"include_usage": True}  # Final chunk reports actual token usage
                 )
                 
-                # Process the stream
-                collected_messages = []
+                # Process the stream into a single growing buffer
+                buffer = io.StringIO()
+                usage = None
                 async for chunk in response:
-                    if hasattr(chunk.choices[0].delta, 'content') and chunk.choices[0].delta.content is not None:
-                        collected_messages.append(chunk.choices[0].delta.content)
-                response_text = "".join(collected_messages)
+                    if chunk.choices:
+                        content = getattr(chunk.choices[0].delta, 'content', None)
+                        if content:
+                            buffer.write(content)
+                    if getattr(chunk, 'usage', None) is not None:
+                        usage = chunk.usage
+                response_text = buffer.getvalue()
                 
-                # Calculate tokens for metrics (estimate based on length)
-                prompt_tokens = len(system_prompt + user_prompt) // 4
-                completion_tokens = len(response_text) // 4
-                self.token_usage["prompt_tokens"] += prompt_tokens
-                self.token_usage["completion_tokens"] += completion_tokens
+                # Record reported token usage, estimating from length if the stream omitted it
+                if usage is not None:
+                    self._record_usage(usage.prompt_tokens, usage.completion_tokens)
+                else:
+                    self._record_usage(len(system_prompt + user_prompt) // 4, len(response_text) // 4)
                 
             except Exception as e:
                 # If json_object format fails, fall back to regular completion
@@ -106,48 +309,41 @@ class BaseModelAnalyzer:
                     stream=False  # Disable streaming in fallback
                 )
             
-            # Update token usage
-            if hasattr(response, 'usage'):
-                self.token_usage["prompt_tokens"] += response.usage.prompt_tokens
-                self.token_usage["completion_tokens"] += response.usage.completion_tokens
+            # Update token usage for non-streamed responses
+            if getattr(response, 'usage', None) is not None:
+                self._record_usage(response.usage.prompt_tokens, response.usage.completion_tokens)
             
             # If we don't already have response_text from streaming
             if 'response_text' not in locals():
                 response_text = response.choices[0].message.content
             
-            # Try to clean up the response if it's not valid JSON
-            try:
-                json.loads(response_text)
-            except json.JSONDecodeError:
-                # If not valid JSON, look for JSON array in the response
-                json_match = re.search(r'(\[\s*\{.*\}\s*\])', response_text, re.DOTALL)
-                if json_match:
-                    response_text = json_match.group(1)
-                    logger.info("Extracted JSON array from response")
-            
-            # Parse findings
-            findings = self._parse_findings(response_text)
-            
-            return findings
+            return response_text, True
             
         except Exception as e:
             logger.error(f"Error in base model analysis: {str(e)}")
-            # Try to parse what we got anyway
-            try:
-                if locals().get('response_text'):
-                    findings = self._parse_findings(response_text)
-                    if findings:
-                        return findings
-            except Exception:
-                pass
-            return []
+            # Return what we got anyway so it can still be parsed
+            return locals().get('response_text'), False
     
     def _parse_findings(self, response_text: str) -> List[VulnerabilityFinding]:
         """Parse LLM response text into structured VulnerabilityFinding objects"""
         findings = []
         try:
-            # Attempt to parse as JSON
-            response_data = json.loads(response_text)
+            # Parse once; only look for an embedded JSON array if the full text is not valid JSON.
+            # Text that does not even start and end like a JSON document skips the full decode
+            stripped = response_text.strip()
+            response_data = None
+            if stripped[:1] in ('{', '[') and stripped[-1:] in ('}', ']'):
+                try:
+                    response_data = orjson.loads(stripped)
+                except orjson.JSONDecodeError:
+                    pass
+            if response_data is None:
+                json_match = _JSON_ARRAY_RE.search(response_text)
+                if not json_match:
+                    logger.error("Error parsing findings from response: no JSON found")
+                    return []
+                response_data = orjson.loads(json_match.group(1))
+                logger.info("Extracted JSON array from response")
             
             # Handle if the response is a dict with a 'findings' key
             if isinstance(response_data, dict) and 'findings' in response_data:
@@ -210,41 +406,36 @@ class BaseModelAnalyzer:
             logger.error(f"Error parsing findings from response: {str(e)}")
             return []
     
-    def _normalize_category(self, category: str) -> str:
+    async def close(self) -> None:
+        """Close the pooled HTTP connections held by the OpenAI client"""
+        await self.client.close()
+    
+    def _record_usage(self, prompt_tokens: int, completion_tokens: int) -> None:
+        """Add token usage to the analyzer totals and to the current request, if one is tracking"""
+        self.token_usage["prompt_tokens"] += prompt_tokens
+        self.token_usage["completion_tokens"] += completion_tokens
+        usage = request_token_usage.get()
+        if usage is not None:
+            usage["prompt_tokens"] += prompt_tokens
+            usage["completion_tokens"] += completion_tokens
+    
+    @staticmethod
+    def _normalize_category(category: str) -> str:
         """Normalize category names to standard format"""
         category = category.upper().replace(' ', '_')
         
-        # Map to standard categories
-        category_map = {
-            'API': 'API_SECURITY',
-            'API_SECURITY': 'API_SECURITY',
-            'PROMPT': 'PROMPT_SECURITY',
-            'PROMPT_INJECTION': 'PROMPT_SECURITY',
-            'PROMPT_SECURITY': 'PROMPT_SECURITY',
-            'CONFIG': 'CONFIGURATION',
-            'CONFIGURATION': 'CONFIGURATION',
-            'ERROR': 'ERROR_HANDLING',
-            'ERROR_HANDLING': 'ERROR_HANDLING'
-        }
-        
-        # Try to match against map
-        for key, value in category_map.items():
-            if key in category:
-                return value
-        
-        return 'GENERAL_SECURITY'
+        # Exact match first, then fall back to keyword containment
+        normalized = _CATEGORY_MAP.get(category)
+        if normalized is not None:
+            return normalized
+        return next((value for key, value in _CATEGORY_MAP.items() if key in category), 'GENERAL_SECURITY')
     
     def _calculate_confidence(self, finding: Dict) -> float:
         """Calculate a confidence score for the finding based on content quality"""
-        confidence = 0.8  # Default confidence
+        # Default confidence, raised for detailed recommendations and descriptions
+        recommendation = finding.get('recommendation') or ''
+        description = finding.get('description') or ''
+        confidence = 0.8 + 0.05 * (len(recommendation) > 50) + 0.05 * (len(description) > 100)
         
-        # Adjust based on recommendation quality
-        if 'recommendation' in finding and len(finding.get('recommendation', '')) > 50:
-            confidence += 0.05
-            
-        # Adjust based on description quality
-        if 'description' in finding and len(finding.get('description', '')) > 100:
-            confidence += 0.05
-            
         # Cap at 1.0
         return min(1.0, confidence) 
\ No newline at end of file
@@ -1,12 +1,23 @@
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from pydantic import Field, field_validator
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import Annotated, List, Optional, Union
 import os
 
 # Get the backend directory path (one level up from app directory)
 BACKEND_DIR = Path(__file__).parent.parent.parent
 
+# Default allowed origins
+DEFAULT_CORS_ORIGINS = (
+    "http://localhost:3000",  # Next.js frontend
+    "http://127.0.0.1:3000",  # Alternative localhost
+    "http://localhost:8000",  # FastAPI backend
+    "http://127.0.0.1:8000",  # Alternative localhost
+    "https://parseon.vercel.app",  # Vercel deployment
+    "https://*.vercel.app",  # All Vercel preview deployments
+)
+
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Parseon"
     VERSION: str = "0.1.0"
@@ -21,6 +32,10 @@ class Settings(BaseSettings):
     # OpenAI
     OPENAI_API_KEY: Optional[str] = None
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo-16k")  # Default model with 16k context window
+    LLM_MAX_CONCURRENT_REQUESTS: int = int(os.getenv("LLM_MAX_CONCURRENT_REQUESTS", "8"))  # In-flight completions per analyzer
+    LLM_MAX_REQUESTS_PER_MINUTE: int = int(os.getenv("LLM_MAX_REQUESTS_PER_MINUTE", "500"))  # 0 or less disables the limit
+    LLM_MAX_TOKENS_PER_MINUTE: int = int(os.getenv("LLM_MAX_TOKENS_PER_MINUTE", "150000"))  # 0 or less disables the limit
+    LLM_MAX_ATTEMPTS: int = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))  # Includes retries of 429/5xx responses
     
     # Database - Modified for Railway deployment support
     DATABASE_URL: Optional[str] = None
@@ -48,7 +63,7 @@ class Settings(BaseSettings):
     RATE_LIMIT_PERIOD: int = int(os.getenv("RATE_LIMIT_PERIOD", "60"))
     
     # CORS - Updated for deployment
-    BACKEND_CORS_ORIGINS: List[str] = []
+    BACKEND_CORS_ORIGINS: Annotated[List[str], NoDecode] = Field(default_factory=lambda: list(DEFAULT_CORS_ORIGINS))  # Comma-separated in the environment
     
     # Monitoring
     ENABLE_METRICS: bool = os.getenv("ENABLE_METRICS", "true").lower() == "true"
@@ -61,10 +76,28 @@ class Settings(BaseSettings):
     # Qdrant
     QDRANT_URL: str = os.getenv("QDRANT_URL", "http://localhost:6333")
     QDRANT_API_KEY: Optional[str] = None
+    VECTOR_SEARCH_HNSW_EF: int = int(os.getenv("VECTOR_SEARCH_HNSW_EF", "100"))  # HNSW search beam width
     
     # Cache
     CACHE_TTL: int = int(os.getenv("CACHE_TTL", "3600"))  # 1 hour
     EMBEDDING_CACHE_TTL: int = int(os.getenv("EMBEDDING_CACHE_TTL", "86400"))  # 24 hours
+    LLM_RESPONSE_CACHE_SIZE: int = int(os.getenv("LLM_RESPONSE_CACHE_SIZE", "256"))  # Entries expire after CACHE_TTL
+    
+    # Semantic cache for similar-finding searches (disabled by default)
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+    SEMANTIC_CACHE_SIZE: int = int(os.getenv("SEMANTIC_CACHE_SIZE", "256"))
+    SEMANTIC_CACHE_QUANTIZE: bool = os.getenv("SEMANTIC_CACHE_QUANTIZE", "false").lower() == "true"  # int8 storage
+    LLM_SEMANTIC_CACHE_ENABLED: bool = os.getenv("LLM_SEMANTIC_CACHE_ENABLED", "false").lower() == "true"  # Reuse analyses of near-identical inputs
+    LLM_SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("LLM_SEMANTIC_CACHE_THRESHOLD", "0.97"))
+    
+    # Embedding model runtime: "torch" (FP32) or "onnx" (INT8 quantized, needs sentence-transformers[onnx])
+    EMBEDDINGS_BACKEND: str = os.getenv("EMBEDDINGS_BACKEND", "torch").lower()
+    EMBEDDING_NUM_THREADS: int = int(os.getenv("EMBEDDING_NUM_THREADS", "0"))  # torch intra-op threads, 0 keeps the default
+    
+    # Coalescing window for concurrent query embeddings
+    EMBEDDING_BATCH_MAX_SIZE: int = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32"))
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "10"))
     
     # API Keys Rotation
     API_KEY_ROTATION_DAYS: int = int(os.getenv("API_KEY_ROTATION_DAYS", "30"))
@@ -74,28 +107,13 @@ class Settings(BaseSettings):
         case_sensitive=True
     )
     
-    def __init__(self, **data):
-        super().__init__(**data)
-        
-        # Parse CORS origins from environment variable if it exists
-        cors_origins_env = os.getenv("BACKEND_CORS_ORIGINS", "")
-        if cors_origins_env:
-            self.BACKEND_CORS_ORIGINS = cors_origins_env.split(",")
-        else:
-            # Default allowed origins
-            self.BACKEND_CORS_ORIGINS = [
-                "http://localhost:3000",  # Next.js frontend
-                "http://127.0.0.1:3000",  # Alternative localhost
-                "http://localhost:8000",  # FastAPI backend
-                "http://127.0.0.1:8000",  # Alternative localhost
-                "https://parseon.vercel.app",  # Vercel deployment
-                "https://*.vercel.app",  # All Vercel preview deployments
-            ]
-            
-        # Use DATABASE_URL from Railway if available
-        railway_db_url = os.getenv("DATABASE_URL")
-        if railway_db_url and not self.DATABASE_URL:
-            self.DATABASE_URL = railway_db_url
+    @field_validator("BACKEND_CORS_ORIGINS", mode="before")
+    @classmethod
+    def _split_cors_origins(cls, value):
+        """Parse CORS origins from a comma-separated environment variable"""
+        if isinstance(value, str):
+            return value.split(",") if value else list(DEFAULT_CORS_ORIGINS)
+        return value
 
 @lru_cache()
 def get_settings() -> Settings:
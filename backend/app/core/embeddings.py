@@ -2,26 +2,75 @@ from typing import List, Dict, Any
 import numpy as np
 from sentence_transformers import SentenceTransformer
 import logging
+import torch
 from functools import lru_cache
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Number of distinct texts whose embeddings each EmbeddingsManager memoizes
+EMBEDDING_MEMO_SIZE = 4096
+
+# Dynamically quantized INT8 ONNX export published alongside the model
+ONNX_INT8_FILE = 'onnx/model_qint8_avx512_vnni.onnx'
+
+def model_cache_id() -> str:
+    """Identifier for cached embeddings (INT8 vectors differ slightly from FP32 ones)"""
+    if settings.EMBEDDINGS_BACKEND == "onnx":
+        return f"{MODEL_NAME}-onnx-int8"
+    return MODEL_NAME
+
+def load_sentence_transformer(**kwargs) -> SentenceTransformer:
+    """Load the embedding model, using the INT8 ONNX Runtime export when EMBEDDINGS_BACKEND=onnx"""
+    # Pin intra-op threads so inference does not oversubscribe cores shared with other workers
+    if settings.EMBEDDING_NUM_THREADS > 0:
+        torch.set_num_threads(settings.EMBEDDING_NUM_THREADS)
+    
+    if settings.EMBEDDINGS_BACKEND == "onnx":
+        try:
+            return SentenceTransformer(
+                MODEL_NAME,
+                backend="onnx",
+                model_kwargs={"file_name": ONNX_INT8_FILE},
+                **kwargs
+            )
+        except Exception as e:
+            logger.warning(f"ONNX embeddings backend unavailable ({str(e)}), falling back to PyTorch")
+    return SentenceTransformer(MODEL_NAME, **kwargs)
+
 @lru_cache()
 def get_model():
     """Singleton pattern to load model only once"""
-    return SentenceTransformer('all-MiniLM-L6-v2')
+    return load_sentence_transformer()
 
 class EmbeddingsManager:
     def __init__(self):
         self.model = get_model()
         self.embedding_dim = 384  # all-MiniLM-L6-v2 dimension
+        
+        # Repeated texts reuse their read-only float32 embedding instead of re-running the model
+        self._encode_cached = lru_cache(maxsize=EMBEDDING_MEMO_SIZE)(self._encode)
+        
+        # Row-normalized matrix of the last pattern embeddings searched, reused across queries
+        self._pattern_source = None
+        self._pattern_vectors: List[List[float]] = []
+        self._pattern_ids: List[str] = []
+        self._pattern_matrix = np.zeros((0, self.embedding_dim), dtype=np.float32)
+
+    def _encode(self, text: str) -> np.ndarray:
+        """Encode a single text into a read-only float32 vector"""
+        # SentenceTransformer is synchronous, but fast enough locally
+        with torch.inference_mode():
+            embedding = np.asarray(self.model.encode(text, convert_to_numpy=True), dtype=np.float32)
+        embedding.setflags(write=False)
+        return embedding
 
     async def create_embedding(self, text: str) -> List[float]:
         """Create embedding for a single text"""
         try:
-            # SentenceTransformer is synchronous, but fast enough locally
-            embedding = self.model.encode(text, convert_to_numpy=True)
-            return embedding.tolist()
+            return self._encode_cached(text).tolist()
         except Exception as e:
             logger.error(f"Error creating embedding: {str(e)}")
             raise
@@ -30,7 +79,8 @@ class EmbeddingsManager:
         """Create embeddings for a batch of texts"""
         try:
             # Batch processing is more efficient
-            embeddings = self.model.encode(texts, convert_to_numpy=True)
+            with torch.inference_mode():
+                embeddings = self.model.encode(texts, convert_to_numpy=True)
             return embeddings.tolist()
         except Exception as e:
             logger.error(f"Error creating batch embeddings: {str(e)}")
@@ -49,17 +99,50 @@ class EmbeddingsManager:
         threshold: float = 0.7
     ) -> List[Dict[str, Any]]:
         """Find similar patterns using embeddings"""
-        query_embedding = await self.create_embedding(query_text)
+        if not pattern_embeddings:
+            return []
+        
+        pattern_ids, pattern_matrix = self._get_pattern_matrix(pattern_embeddings)
+        try:
+            query_embedding = self._encode_cached(query_text)
+        except Exception as e:
+            logger.error(f"Error creating embedding: {str(e)}")
+            raise
+        query_norm = np.linalg.norm(query_embedding)
+        if query_norm == 0:
+            return []
         
-        similar_patterns = []
-        for pattern_id, pattern_embedding in pattern_embeddings.items():
-            similarity = self.calculate_similarity(query_embedding, pattern_embedding)
-            if similarity >= threshold:
-                similar_patterns.append({
-                    "pattern_id": pattern_id,
-                    "similarity": similarity
-                })
+        # Cosine similarity against every pattern in a single matrix-vector product
+        similarities = pattern_matrix @ (query_embedding / query_norm)
+        matches = np.flatnonzero(similarities >= threshold)
         
         # Sort by similarity score
-        similar_patterns.sort(key=lambda x: x["similarity"], reverse=True)
-        return similar_patterns 
\ No newline at end of file
+        matches = matches[np.argsort(-similarities[matches], kind="stable")]
+        return [
+            {"pattern_id": pattern_ids[i], "similarity": float(similarities[i])}
+            for i in matches
+        ]
+    
+    def _get_pattern_matrix(self, pattern_embeddings: Dict[str, List[float]]):
+        """Return pattern ids and their row-normalized float32 matrix, rebuilt when the mapping changes.
+
+        A mapping is considered unchanged when it holds the same keys bound to the same
+        vector objects; vectors are expected to be replaced, not mutated in place.
+        """
+        vectors = list(pattern_embeddings.values())
+        if (
+            self._pattern_source is not pattern_embeddings
+            or len(vectors) != len(self._pattern_vectors)
+            or any(new is not old for new, old in zip(vectors, self._pattern_vectors))
+            or list(pattern_embeddings.keys()) != self._pattern_ids
+        ):
+            pattern_ids = list(pattern_embeddings.keys())
+            matrix = np.asarray(vectors, dtype=np.float32).reshape(len(pattern_ids), -1)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            
+            self._pattern_ids = pattern_ids
+            self._pattern_matrix = matrix / norms
+            self._pattern_vectors = vectors
+            self._pattern_source = pattern_embeddings
+        return self._pattern_ids, self._pattern_matrix
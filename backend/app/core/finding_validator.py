@@ -6,29 +6,74 @@ embeddings and other validation strategies to reduce hallucinations and
 increase confidence in the findings.
 """
 
-from typing import Dict, List, Optional, Any
+from typing import List, Optional, Tuple
+from collections import OrderedDict
+from functools import cached_property
+import asyncio
+import hashlib
+from types import MappingProxyType
 import logging
 import numpy as np
 from app.schemas.assessment import VulnerabilityFinding
 from app.core.knowledge_base import KnowledgeBase
-from app.services.embeddings_service import EmbeddingsService
+from app.services.embeddings_service import EmbeddingsService, get_shared_embeddings_service
 
 logger = logging.getLogger(__name__)
 
-# Global embedding cache to persist across requests
-_GLOBAL_EMBEDDING_CACHE = {}
+# Reduced list of known vulnerability types to improve performance
+_VULNERABILITY_TYPES = (
+    # Combined prompt injection vulnerabilities
+    "Prompt injection vulnerability in AI systems",
+    
+    # Combined API security issues
+    "Missing rate limiting and hardcoded API keys",
+    
+    # Combined configuration issues
+    "Insecure AI model configuration settings",
+    
+    # Combined error handling issues
+    "Poor error handling in AI systems"
+)
+
+# Global embedding cache to persist across requests (least recently stored entries evicted first)
+_GLOBAL_EMBEDDING_CACHE: "OrderedDict[str, np.ndarray]" = OrderedDict()
 _MAX_CACHE_ENTRIES = 100  # Limit cache size to avoid memory issues
 
+# Serializes the one-time embedding of the known vulnerability types across concurrent requests
+_INIT_LOCK = asyncio.Lock()
+
+# Normalized embeddings of validated finding texts keyed by content digest, least recently used evicted first
+_FINDING_EMBEDDING_CACHE: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+_MAX_FINDING_CACHE_ENTRIES = 500
+
+# Keywords for different vulnerability categories (fast-mode validation)
+_CATEGORY_KEYWORDS = MappingProxyType({
+    "PROMPT_SECURITY": ("prompt injection", "system prompt", "prompt", "user input", "sanitization"),
+    "API_SECURITY": ("api key", "rate limit", "authentication", "authorization", "token"),
+    "CONFIGURATION": ("configuration", "parameter", "temperature", "max_tokens", "model settings"),
+    "ERROR_HANDLING": ("error handling", "exception", "validation", "error message")
+})
+
+# Default validation for categories without keywords (copied per finding so it is never shared)
+_UNKNOWN_VALIDATION = MappingProxyType({
+    "validation_score": 0.5,
+    "similar_vulnerability": "Unknown",
+    "validated": True,
+    "confidence_adjustment": "unchanged"
+})
+
 class FindingValidator:
     """
     Validates findings from security analysis against known patterns
     to reduce hallucination and increase confidence.
     """
     
-    def __init__(self, knowledge_base: Optional[KnowledgeBase] = None):
-        """Initialize with optional knowledge base"""
-        self.knowledge_base = knowledge_base or KnowledgeBase()
-        self.embeddings_service = EmbeddingsService()
+    def __init__(self, knowledge_base: Optional[KnowledgeBase] = None, embeddings_service: Optional[EmbeddingsService] = None):
+        """Initialize with optional knowledge base and embeddings service (shared by default)"""
+        # Without a knowledge base, one is created on first access
+        if knowledge_base is not None:
+            self.knowledge_base = knowledge_base
+        self.embeddings_service = embeddings_service or get_shared_embeddings_service()
         
         # Thresholds for validation - slightly lower for better performance
         self.similarity_threshold = 0.45  # Slightly lower than before
@@ -36,6 +81,15 @@ class FindingValidator:
         
         # Use global cache for embeddings
         self._vulnerability_embeddings = _GLOBAL_EMBEDDING_CACHE
+        
+        # Read-only row-normalized matrix of the cached embeddings, replaced when the cache changes
+        self._vuln_keys: Tuple[str, ...] = ()
+        self._vuln_matrix = np.zeros((0, 0), dtype=np.float32)
+    
+    @cached_property
+    def knowledge_base(self) -> KnowledgeBase:
+        """Default knowledge base, created on first use"""
+        return KnowledgeBase()
     
     async def initialize(self):
         """Initialize embeddings and services"""
@@ -47,39 +101,47 @@ class FindingValidator:
     
     async def _initialize_vulnerability_embeddings(self):
         """Initialize embeddings for known vulnerability types"""
-        # Reduced list of vulnerability types to improve performance
-        vulnerability_types = [
-            # Combined prompt injection vulnerabilities
-            "Prompt injection vulnerability in AI systems",
-            
-            # Combined API security issues
-            "Missing rate limiting and hardcoded API keys",
-            
-            # Combined configuration issues
-            "Insecure AI model configuration settings",
+        async with _INIT_LOCK:
+            # Another request may have finished initializing while this one waited
+            if self._vulnerability_embeddings:
+                return
             
-            # Combined error handling issues
-            "Poor error handling in AI systems"
-        ]
+            # Batch process embeddings for performance
+            all_embeddings = await self.embeddings_service.generate_embeddings_batch(list(_VULNERABILITY_TYPES))
+            self._store_vulnerability_embeddings(all_embeddings)
+    
+    def _store_vulnerability_embeddings(self, all_embeddings):
+        """Cache embeddings of the known vulnerability types and rebuild the similarity matrix"""
+        # Store in cache as unit-length float32 vectors
+        for vuln_type, embedding in zip(_VULNERABILITY_TYPES, all_embeddings):
+            self._cache_embedding(vuln_type, self._normalize(embedding))
         
-        # Batch process embeddings for performance
-        all_embeddings = await self.embeddings_service.generate_embeddings_batch(vulnerability_types)
+        self._build_vulnerability_matrix()
+    
+    def _build_vulnerability_matrix(self):
+        """Stack the cached (already normalized) vulnerability embeddings into one float32 matrix"""
+        keys = tuple(self._vulnerability_embeddings.keys())
+        matrix = np.ascontiguousarray(
+            list(self._vulnerability_embeddings.values()), dtype=np.float32
+        ).reshape(len(keys), -1)
         
-        # Store in cache
-        for i, vuln_type in enumerate(vulnerability_types):
-            self._vulnerability_embeddings[vuln_type] = all_embeddings[i]
-            
-        # Prune cache if needed
-        self._prune_cache()
+        # Published as new read-only objects, so readers never see a partially built matrix
+        matrix.setflags(write=False)
+        self._vuln_keys, self._vuln_matrix = keys, matrix
     
-    def _prune_cache(self):
-        """Prune the embedding cache if it exceeds maximum size"""
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        """Convert an embedding to a unit-length float32 vector, leaving zero vectors as zeros"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+    
+    def _cache_embedding(self, key: str, embedding: np.ndarray):
+        """Store an embedding, evicting the least recently stored entry when full"""
+        self._vulnerability_embeddings[key] = embedding
+        self._vulnerability_embeddings.move_to_end(key)
         if len(self._vulnerability_embeddings) > _MAX_CACHE_ENTRIES:
-            # Remove oldest entries (simple approximation by converting to list)
-            excess_count = len(self._vulnerability_embeddings) - _MAX_CACHE_ENTRIES
-            keys_to_remove = list(self._vulnerability_embeddings.keys())[:excess_count]
-            for key in keys_to_remove:
-                del self._vulnerability_embeddings[key]
+            self._vulnerability_embeddings.popitem(last=False)
     
     async def validate_findings(self, findings: List[VulnerabilityFinding], fast_mode: bool = False) -> List[VulnerabilityFinding]:
         """
@@ -95,78 +157,113 @@ class FindingValidator:
         
         # Fast mode uses keyword matching instead of embeddings
         if fast_mode:
-            return self._fast_validate_findings(findings)
+            return self.validate_findings_fast(findings)
         
-        # Make sure embeddings are initialized
-        if not self._vulnerability_embeddings:
-            await self._initialize_vulnerability_embeddings()
-        
-        validated_findings = []
+        validated_findings: List[Optional[VulnerabilityFinding]] = [None] * len(findings)
         
         # Prepare batch of descriptions for embedding generation
-        descriptions = []
-        for finding in findings:
-            description = f"{finding.title}. {finding.description[:300]}"
-            descriptions.append(description)
+        descriptions = [f"{finding.title}. {finding.description[:300]}" for finding in findings]
+        
+        # Reuse embeddings of previously validated texts and generate the rest in one batch,
+        # together with the known vulnerability types if they are not embedded yet
+        if self._vulnerability_embeddings:
+            finding_matrix = await self._get_finding_embeddings(descriptions)
+        else:
+            async with _INIT_LOCK:
+                finding_matrix = await self._get_finding_embeddings(
+                    descriptions, include_vulnerability_types=not self._vulnerability_embeddings
+                )
         
-        # Generate embeddings in batch
-        finding_embeddings = await self.embeddings_service.generate_embeddings_batch(descriptions)
+        # Another validator may have refreshed the shared cache since the matrix was built
+        if self._vuln_keys != tuple(self._vulnerability_embeddings):
+            self._build_vulnerability_matrix()
+        
+        # Cosine similarity of every finding against every known vulnerability in one product
+        if self._vuln_keys:
+            similarities = finding_matrix @ self._vuln_matrix.T
+            best_indices = similarities.argmax(axis=1)
+            best_similarities = similarities[np.arange(len(findings)), best_indices]
+        else:
+            best_indices = np.zeros(len(findings), dtype=np.intp)
+            best_similarities = np.zeros(len(findings), dtype=np.float32)
         
-        # Process each finding with its embedding
+        # Process each finding with its best match
         for i, finding in enumerate(findings):
-            # Find the most similar known vulnerability
+            # Only a positive similarity counts as a match
             best_similarity = 0
             most_similar_vuln = None
-            
-            # Get the embedding for this finding
-            finding_embedding = finding_embeddings[i]
-            
-            for vuln_type, vuln_embedding in self._vulnerability_embeddings.items():
-                similarity = self._calculate_similarity(finding_embedding, vuln_embedding)
-                if similarity > best_similarity:
-                    best_similarity = similarity
-                    most_similar_vuln = vuln_type
+            if best_similarities[i] > 0:
+                best_similarity = float(best_similarities[i])
+                most_similar_vuln = self._vuln_keys[best_indices[i]]
             
             # Update finding based on similarity score
-            validated_finding = self._update_finding_confidence(finding, best_similarity, most_similar_vuln)
-            validated_findings.append(validated_finding)
+            validated_findings[i] = self._update_finding_confidence(finding, best_similarity, most_similar_vuln)
             
-            # Avoid costly print statement in tight loop
-            logger.debug(f"Validation: '{finding.title}' -> Similarity: {best_similarity:.2f}, Similar to: {most_similar_vuln}")
+            # Lazy formatting keeps the tight loop free of string building unless debugging
+            logger.debug("Validation: '%s' -> Similarity: %.2f, Similar to: %s", finding.title, best_similarity, most_similar_vuln)
         
         return validated_findings
     
-    def _fast_validate_findings(self, findings: List[VulnerabilityFinding]) -> List[VulnerabilityFinding]:
-        """Fast validation using keyword matching instead of embeddings"""
-        validated_findings = []
+    async def _get_finding_embeddings(self, descriptions: List[str], include_vulnerability_types: bool = False) -> np.ndarray:
+        """
+        Return a matrix of normalized embeddings for the descriptions, using the finding cache
         
-        # Keywords for different vulnerability categories
-        keywords = {
-            "PROMPT_SECURITY": ["prompt injection", "system prompt", "prompt", "user input", "sanitization"],
-            "API_SECURITY": ["api key", "rate limit", "authentication", "authorization", "token"],
-            "CONFIGURATION": ["configuration", "parameter", "temperature", "max_tokens", "model settings"],
-            "ERROR_HANDLING": ["error handling", "exception", "validation", "error message"]
-        }
+        With include_vulnerability_types, the known vulnerability types are embedded in the
+        same batch and cached, saving a separate embeddings call on a cold start.
+        """
+        keys = [hashlib.blake2b(description.encode(), digest_size=16).digest() for description in descriptions]
+        rows: List[Optional[np.ndarray]] = [None] * len(descriptions)
+        misses = []
+        for i, key in enumerate(keys):
+            cached = _FINDING_EMBEDDING_CACHE.get(key)
+            if cached is None:
+                misses.append(i)
+            else:
+                _FINDING_EMBEDDING_CACHE.move_to_end(key)
+                rows[i] = cached
         
-        for finding in findings:
-            # Calculate keyword matches
-            category = finding.category
-            title_lower = finding.title.lower()
-            description_lower = finding.description.lower()
+        texts = [descriptions[i] for i in misses]
+        if include_vulnerability_types:
+            texts = list(_VULNERABILITY_TYPES) + texts
+        
+        if texts:
+            embeddings = await self.embeddings_service.generate_embeddings_batch(texts)
+            if include_vulnerability_types:
+                self._store_vulnerability_embeddings(embeddings[:len(_VULNERABILITY_TYPES)])
+                embeddings = embeddings[len(_VULNERABILITY_TYPES):]
             
+            for i, embedding in zip(misses, embeddings):
+                vector = self._normalize(embedding)
+                rows[i] = vector
+                # Zero vectors are fallbacks for failed embeddings and are not worth keeping
+                if vector.any():
+                    vector.setflags(write=False)
+                    _FINDING_EMBEDDING_CACHE[keys[i]] = vector
+                    _FINDING_EMBEDDING_CACHE.move_to_end(keys[i])
+                    if len(_FINDING_EMBEDDING_CACHE) > _MAX_FINDING_CACHE_ENTRIES:
+                        _FINDING_EMBEDDING_CACHE.popitem(last=False)
+        
+        return np.stack(rows)
+    
+    def validate_findings_fast(self, findings: List[VulnerabilityFinding]) -> List[VulnerabilityFinding]:
+        """Fast validation using keyword matching instead of embeddings (synchronous, no awaiting needed)"""
+        validated_findings: List[Optional[VulnerabilityFinding]] = [None] * len(findings)
+        
+        for i, finding in enumerate(findings):
             # Default confidence
             confidence = finding.confidence
             
             # Adjust confidence based on keyword matches
-            if category in keywords:
-                category_keywords = keywords[category]
-                match_count = sum(1 for keyword in category_keywords if 
-                                  keyword in title_lower or keyword in description_lower)
+            category_keywords = _CATEGORY_KEYWORDS.get(finding.category)
+            if category_keywords is not None:
+                # One lowercase pass; the newline keeps keywords from matching across title and description
+                text = f"{finding.title}\n{finding.description}".lower()
+                match_count = sum(keyword in text for keyword in category_keywords)
                 
                 # Set validation info
                 validation_info = {
                     "validation_score": min(1.0, match_count / len(category_keywords)),
-                    "similar_vulnerability": category,
+                    "similar_vulnerability": finding.category,
                     "validated": match_count > 0,
                     "confidence_adjustment": "keyword_based"
                 }
@@ -180,48 +277,20 @@ class FindingValidator:
                     validation_info["confidence_adjustment"] = "reduced"
             else:
                 # For unknown categories, use a default validation
-                validation_info = {
-                    "validation_score": 0.5,
-                    "similar_vulnerability": "Unknown",
-                    "validated": True,
-                    "confidence_adjustment": "unchanged"
-                }
+                validation_info = dict(_UNKNOWN_VALIDATION)
                 
-            # Create validated finding
-            updated_finding = VulnerabilityFinding(
-                id=finding.id,
-                title=finding.title,
-                description=finding.description,
-                severity=finding.severity,
-                category=finding.category,
-                code_snippets=finding.code_snippets,
-                recommendation=finding.recommendation,
-                confidence=confidence,
-                validation_info=validation_info
-            )
-            
-            validated_findings.append(updated_finding)
+            # Copy the already-validated finding with the new confidence and validation info
+            validated_findings[i] = finding.model_copy(update={"confidence": confidence, "validation_info": validation_info})
             
         return validated_findings
     
     def _calculate_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
         """Calculate cosine similarity between two embeddings"""
-        if not embedding1 or not embedding2:
+        if len(embedding1) == 0 or len(embedding2) == 0:
             return 0
         
-        # Convert to numpy arrays
-        v1 = np.array(embedding1)
-        v2 = np.array(embedding2)
-        
-        # Calculate cosine similarity
-        dot_product = np.dot(v1, v2)
-        norm1 = np.linalg.norm(v1)
-        norm2 = np.linalg.norm(v2)
-        
-        if norm1 == 0 or norm2 == 0:
-            return 0
-            
-        return dot_product / (norm1 * norm2)
+        # Cosine similarity is the dot product of the unit vectors (zero vectors score 0)
+        return float(np.dot(self._normalize(embedding1), self._normalize(embedding2)))
     
     def _update_finding_confidence(
         self, 
@@ -230,18 +299,6 @@ class FindingValidator:
         similar_vuln: Optional[str]
     ) -> VulnerabilityFinding:
         """Update finding confidence based on validation results"""
-        # Create a copy of the finding to avoid modifying the original
-        updated_finding = VulnerabilityFinding(
-            id=finding.id,
-            title=finding.title,
-            description=finding.description,
-            severity=finding.severity,
-            category=finding.category,
-            code_snippets=finding.code_snippets,
-            recommendation=finding.recommendation,
-            confidence=finding.confidence
-        )
-        
         # Create validation info
         validation_info = {
             "validation_score": similarity,
@@ -250,31 +307,18 @@ class FindingValidator:
         }
         
         # Adjust confidence based on similarity
+        confidence = finding.confidence
         if similarity >= self.boost_threshold:
             # High similarity - boost confidence
-            updated_finding.confidence = min(1.0, finding.confidence + 0.15)
+            confidence = min(1.0, finding.confidence + 0.15)
             validation_info["confidence_adjustment"] = "boosted"
         elif similarity < self.similarity_threshold:
             # Low similarity - reduce confidence
-            updated_finding.confidence = max(0.1, finding.confidence - 0.2)
+            confidence = max(0.1, finding.confidence - 0.2)
             validation_info["confidence_adjustment"] = "reduced"
         else:
             # Medium similarity - no change
             validation_info["confidence_adjustment"] = "unchanged"
         
-        # Set the validation info on the finding
-        updated_finding.validation_info = validation_info
-        
-        return updated_finding
-    
-    async def keyword_validation(self, finding: VulnerabilityFinding) -> Dict[str, Any]:
-        """
-        Alternate validation method using keyword matching
-        This can be used as a fallback or in addition to embedding validation
-        """
-        # Placeholder for keyword validation logic
-        # This would check for specific keywords related to known vulnerabilities
-        return {
-            "keyword_validation": "not_implemented",
-            "score": 0.5
-        } 
\ No newline at end of file
+        # Copy the finding (leaving the original untouched) without revalidating its fields
+        return finding.model_copy(update={"confidence": confidence, "validation_info": validation_info})
@@ -1,9 +1,12 @@
-from typing import Dict, List, Optional
-from pydantic import BaseModel
-import json
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from collections import Counter, OrderedDict
+from pydantic import BaseModel, TypeAdapter
+import orjson
 import csv
 import aiohttp
 import asyncio
+import hashlib
+import threading
 from pathlib import Path
 import logging
 import os
@@ -16,6 +19,95 @@ import yaml
 
 logger = logging.getLogger(__name__)
 
+# Parsed sources kept per knowledge base, keyed by a hash of their content
+_MAX_PARSED_SOURCES = 16
+
+# Patterns used by the extraction helpers, compiled once at import
+_CODE_BLOCK_RE = re.compile(r'```[^\n]*\n(.*?)```', re.DOTALL)
+_INLINE_CODE_BLOCK_RE = re.compile(r'```[^`]+```')
+_WHITESPACE_RE = re.compile(r'\s+')
+# All severity indicators in one alternation; bare "critical" subsumes "severity: critical" and "critical risk"
+_SEVERITY_RE = re.compile(
+    r'(?P<critical>critical|devastating|severe|dangerous|severity:\s*high|high\s*risk)'
+    r'|(?P<medium>severity:\s*medium|medium\s*risk)'
+    r'|(?P<low>severity:\s*low|low\s*risk)'
+)
+_PATTERN_SECTION_RE = re.compile(r'(pattern|detection|rule):\s*(.*?)(?=\n\n|\Z)', re.IGNORECASE | re.DOTALL)
+_PHRASE_RE = re.compile(r'\b\w+(?:\s+\w+){1,2}\b')
+# A greedy letter run already covers camelCase, so no trailing group (and no backtracking) is needed
+_TECH_TERM_RE = re.compile(r'\b[A-Za-z]+\b')
+_SECURITY_TERMS = frozenset({
+    "vulnerability", "attack", "exploit", "security", "risk", "threat", "protection", "mitigation", "defense"
+})
+# Case-insensitive so long sections are scanned as-is instead of copied by lower()
+_SECURITY_TERM_RE = re.compile(r'\b(' + '|'.join(sorted(_SECURITY_TERMS)) + r')\b', re.IGNORECASE)
+_REQUIREMENT_RES = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'(?:must|should|needs? to|requires?|ensure)\s+([^.!?\n]+)',
+    r'if\s+([^,\n]+),\s*then\s+([^.!?\n]+)',
+    r'when\s+([^,\n]+),\s*([^.!?\n]+)',
+    r'(?:verify|validate|check)\s+([^.!?\n]+)'
+))
+# Headers in priority order; the lookahead finds every occurrence in one pass without consuming text
+_MITIGATION_HEADERS = ('mitigation', 'remediation', 'solution', 'prevention', 'countermeasures')
+_MITIGATION_RE = re.compile(
+    r'(?=(' + '|'.join(_MITIGATION_HEADERS) + r'):\s*(.*?)(?=\n\n|\Z))',
+    re.IGNORECASE | re.DOTALL
+)
+_REFERENCES_RE = re.compile(r'(references|see also|related):\s*(.*?)(?=\n\n|\Z)', re.IGNORECASE | re.DOTALL)
+
+# Category indicators with weights
+_CATEGORY_INDICATORS = {
+    "Model Security": {
+        "terms": ("model", "training", "inference", "weights", "parameters", "neural", "ai system"),
+        "weight": 1.5
+    },
+    "Data Security": {
+        "terms": ("data", "dataset", "input", "output", "preprocessing", "validation"),
+        "weight": 1.3
+    },
+    "API Security": {
+        "terms": ("api", "endpoint", "request", "response", "http", "rest"),
+        "weight": 1.2
+    },
+    "Prompt Security": {
+        "terms": ("prompt", "instruction", "completion", "token", "generation"),
+        "weight": 1.4
+    }
+}
+_CATEGORY_TERMS = tuple(term for indicators in _CATEGORY_INDICATORS.values() for term in indicators["terms"])
+# Non-consuming lookahead so every start position is tried; longest alternative first.
+# No term overlaps itself, so positional counts equal the previous str.count results.
+_CATEGORY_TERM_RE = re.compile(
+    r'(?=(' + '|'.join(re.escape(term) for term in sorted(_CATEGORY_TERMS, key=len, reverse=True)) + r'))'
+)
+_CATEGORY_TERM_PREFIXES = {
+    term: tuple(other for other in _CATEGORY_TERMS if term.startswith(other))
+    for term in _CATEGORY_TERMS
+}
+
+# Shared HTTP session so refreshes reuse pooled keep-alive connections and cached DNS
+_session: Optional[aiohttp.ClientSession] = None
+
+async def _get_session() -> aiohttp.ClientSession:
+    """Return the shared HTTP session, creating it on first use."""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=100,
+            limit_per_host=10,
+            ttl_dns_cache=300,
+            enable_cleanup_closed=True
+        )
+        _session = aiohttp.ClientSession(connector=connector)
+    return _session
+
+async def close_session() -> None:
+    """Close the shared HTTP session on application shutdown."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
 class SecurityPattern(BaseModel):
     """Represents a security pattern or rule in the knowledge base."""
     id: str
@@ -30,6 +122,9 @@ class SecurityPattern(BaseModel):
     context_rules: List[str] = []  # Context-specific rules for pattern validation
     related_patterns: List[str] = []  # IDs of semantically related patterns
 
+# Parses and validates the whole patterns file in one call instead of per record
+_PATTERNS_ADAPTER = TypeAdapter(List[SecurityPattern])
+
 class KnowledgeBase:
     """Manages the security knowledge base for grounding AI assessments."""
     
@@ -38,6 +133,16 @@ class KnowledgeBase:
         self.patterns_file = patterns_file or str(Path(__file__).parent / "data" / "security_patterns.json")
         self.test_mode = True  # Force test mode
         self.semantic_clusters: Dict[str, List[str]] = {}  # Category -> List of pattern IDs
+        self.source_cache_dir = Path("cache/knowledge_base")  # Downloaded sources and their validators
+        self._parsed_sources: OrderedDict[bytes, Dict[str, SecurityPattern]] = OrderedDict()
+        self._parsed_sources_lock = threading.Lock()  # Sources are parsed in worker threads
+        self._dumped: Dict[str, Tuple[SecurityPattern, bytes]] = {}  # Pattern ID -> (pattern, serialized JSON)
+        self._dirty: Set[str] = set()  # Pattern IDs to re-serialize on the next save
+        # Category/source -> {pattern ID: pattern}, kept in step with self.patterns
+        self._by_category: Dict[str, Dict[str, SecurityPattern]] = {}
+        self._by_source: Dict[str, Dict[str, SecurityPattern]] = {}
+        self._bucket_keys: Dict[str, Tuple[str, str]] = {}  # Pattern ID -> (category, source)
+        self._indexed_patterns: Dict[str, SecurityPattern] = self.patterns
         
         # Always use test data for now
         self.sources = {
@@ -63,7 +168,7 @@ class KnowledgeBase:
         """Initialize the knowledge base by loading patterns from external sources."""
         try:
             # Load local patterns first
-            self._load_patterns()
+            await self._aload_patterns()
             
             # Create data directory if it doesn't exist
             Path(self.patterns_file).parent.mkdir(parents=True, exist_ok=True)
@@ -72,48 +177,117 @@ class KnowledgeBase:
             await self._load_external_patterns()
             
             # Save combined patterns to local file
-            self._save_patterns()
+            await self._asave_patterns()
             
         except Exception as e:
             logger.error(f"Error initializing knowledge base: {str(e)}")
             # Ensure we at least have local patterns if external sources fail
-            self._load_patterns()
+            await self._aload_patterns()
     
     async def _load_external_patterns(self):
         """Load security patterns from external sources."""
         if self.test_mode:
-            for source_name, path in self.sources.items():
-                try:
-                    with open(path, 'r') as f:
-                        content = f.read()
-                        if path.endswith('.md'):
-                            patterns = self._extract_patterns_from_markdown(content, source_name)
-                            self.patterns.update(patterns)
-                        elif path.endswith('.yaml') or path.endswith('.yml'):
-                            patterns = self._extract_patterns_from_yaml(content, source_name)
-                            self.patterns.update(patterns)
-                except Exception as e:
-                    logger.error(f"Error loading patterns from {source_name}: {str(e)}")
-            return
+            results = await asyncio.gather(
+                *(self._read_source(name, path) for name, path in self.sources.items()),
+                return_exceptions=True
+            )
+        else:
+            session = await _get_session()
+            results = await asyncio.gather(
+                *(self._fetch_source(session, name, url) for name, url in self.sources.items()),
+                return_exceptions=True
+            )
+
+        # Merge in source order so later sources win on ID collisions, as before
+        for source_name, result in zip(self.sources, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error loading patterns from {source_name}: {str(result)}")
+            else:
+                self._put_patterns(result.values())
+
+    async def _read_source(self, source_name: str, path: str) -> Dict[str, SecurityPattern]:
+        """Read a local source file off the event loop and extract its patterns."""
+        content = await asyncio.to_thread(Path(path).read_text)
+        return await asyncio.to_thread(self._extract_patterns_from_source, content, source_name, path)
+
+    async def _fetch_source(self, session: aiohttp.ClientSession, source_name: str, url: str) -> Dict[str, SecurityPattern]:
+        """Download a single external source, revalidating any cached copy, and extract its patterns."""
+        cached = await asyncio.to_thread(self._read_cached_source, source_name)
+        headers = {}
+        if cached is not None:
+            meta, _ = cached
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304 and cached is not None:
+                logger.debug(f"Source {source_name} not modified, using cached copy")
+                content = cached[1]
+            elif response.status != 200:
+                logger.warning(f"Failed to load patterns from {source_name}: {response.status}")
+                return {}
+            else:
+                content = await response.text()
+                meta = {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified")
+                }
+                await asyncio.to_thread(self._write_cached_source, source_name, meta, content)
+        return await asyncio.to_thread(self._extract_patterns_from_source, content, source_name, url)
+
+    def _read_cached_source(self, source_name: str) -> Optional[Tuple[dict, str]]:
+        """Return the cached validators and content for a source, if both exist."""
+        meta_file = self.source_cache_dir / f"{source_name}.meta.json"
+        content_file = self.source_cache_dir / f"{source_name}.content"
+        try:
+            return orjson.loads(meta_file.read_bytes()), content_file.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache for {source_name}: {str(e)}")
+            return None
+
+    def _write_cached_source(self, source_name: str, meta: dict, content: str) -> None:
+        """Store a downloaded source with the validators needed to revalidate it."""
+        try:
+            self.source_cache_dir.mkdir(parents=True, exist_ok=True)
+            # Content first, so a meta file never points at a stale body
+            (self.source_cache_dir / f"{source_name}.content").write_text(content, encoding="utf-8")
+            (self.source_cache_dir / f"{source_name}.meta.json").write_bytes(orjson.dumps(meta))
+        except Exception as e:
+            logger.warning(f"Failed to cache source {source_name}: {str(e)}")
 
-        async with aiohttp.ClientSession() as session:
-            for source_name, url in self.sources.items():
-                try:
-                    async with session.get(url) as response:
-                        if response.status == 200:
-                            content = await response.text()
-                            if url.endswith('.md'):
-                                patterns = self._extract_patterns_from_markdown(content, source_name)
-                                self.patterns.update(patterns)
-                            elif url.endswith('.yaml') or url.endswith('.yml'):
-                                patterns = self._extract_patterns_from_yaml(content, source_name)
-                                self.patterns.update(patterns)
-                            else:
-                                logger.warning(f"Unsupported file format for {source_name}: {url}")
-                        else:
-                            logger.warning(f"Failed to load patterns from {source_name}: {response.status}")
-                except Exception as e:
-                    logger.error(f"Error loading patterns from {source_name}: {str(e)}")
+    def _extract_patterns_from_source(self, content: str, source_name: str, location: str) -> Dict[str, SecurityPattern]:
+        """Extract patterns from a source, reusing the previous parse when its content is unchanged."""
+        hasher = hashlib.blake2b(digest_size=16)
+        for part in (source_name, location, content):
+            hasher.update(part.encode())
+            hasher.update(b"\0")
+        key = hasher.digest()
+
+        with self._parsed_sources_lock:
+            patterns = self._parsed_sources.get(key)
+            if patterns is not None:
+                self._parsed_sources.move_to_end(key)
+                return patterns
+
+        patterns = self._parse_source(content, source_name, location)
+        with self._parsed_sources_lock:
+            self._parsed_sources[key] = patterns
+            if len(self._parsed_sources) > _MAX_PARSED_SOURCES:
+                self._parsed_sources.popitem(last=False)
+        return patterns
+
+    def _parse_source(self, content: str, source_name: str, location: str) -> Dict[str, SecurityPattern]:
+        """Extract patterns using the parser that matches the source's file format."""
+        if location.endswith('.md'):
+            return self._extract_patterns_from_markdown(content, source_name)
+        if location.endswith('.yaml') or location.endswith('.yml'):
+            return self._extract_patterns_from_yaml(content, source_name)
+        logger.warning(f"Unsupported file format for {source_name}: {location}")
+        return {}
     
     def _extract_patterns_from_markdown(self, content: str, source_name: str) -> Dict[str, SecurityPattern]:
         """Extract security patterns from markdown content with semantic understanding."""
@@ -145,14 +319,13 @@ class KnowledgeBase:
             
             # Extract examples with context
             examples = []
-            code_blocks = re.findall(r'```[^\n]*\n(.*?)```', section, re.DOTALL)
-            for block in code_blocks:
-                # Include some context around the code block
-                block_lines = block.strip().split('\n')
-                if len(block_lines) > 1:
+            for block in _CODE_BLOCK_RE.finditer(section):
+                # Only multi-line blocks are kept, with some context around them
+                code = block.group(1).strip()
+                if '\n' in code:
                     examples.append({
-                        'code': block.strip(),
-                        'context': self._extract_context_around_block(section, block)
+                        'code': code,
+                        'context': self._extract_context_around_block(section, block.start(1), block.end(1))
                     })
             
             # Extract semantic indicators
@@ -247,30 +420,27 @@ class KnowledgeBase:
         """Determine severity based on content analysis."""
         content_lower = content.lower()
         
-        # Check for explicit severity indicators
-        if re.search(r'severity:\s*(critical|high)', content_lower) or \
-           re.search(r'(critical|high)\s*risk', content_lower) or \
-           any(word in content_lower for word in ['devastating', 'severe', 'critical', 'dangerous']):
-            return "critical"
-        elif re.search(r'severity:\s*medium', content_lower) or \
-             re.search(r'medium\s*risk', content_lower):
-            return "medium"
-        elif re.search(r'severity:\s*low', content_lower) or \
-             re.search(r'low\s*risk', content_lower):
+        # Check for explicit severity indicators in one scan; critical wins over medium, medium over low
+        found = set()
+        for match in _SEVERITY_RE.finditer(content_lower):
+            if match.lastgroup == "critical":
+                return "critical"
+            found.add(match.lastgroup)
+        if "low" in found and "medium" not in found:
             return "low"
             
-        # Default to medium if no clear indicators
+        # Medium indicators and the default both resolve to medium
         return "medium"
         
     def _extract_pattern(self, content: str) -> str:
         """Extract pattern or detection rules from content."""
         # Try to find explicit pattern sections
-        pattern_match = re.search(r'(?i)(pattern|detection|rule):\s*(.*?)(?=\n\n|\Z)', content, re.DOTALL)
+        pattern_match = _PATTERN_SECTION_RE.search(content)
         if pattern_match:
             return pattern_match.group(2).strip()
             
         # If no explicit pattern, try to extract from code blocks
-        code_blocks = re.findall(r'```[^\n]*\n(.*?)```', content, re.DOTALL)
+        code_blocks = _CODE_BLOCK_RE.findall(content)
         if code_blocks:
             return code_blocks[0].strip()
             
@@ -280,34 +450,19 @@ class KnowledgeBase:
         """Determine pattern category using semantic analysis."""
         text = f"{title} {description}".lower()
         
-        # Define category indicators with weights
-        category_indicators = {
-            "Model Security": {
-                "terms": ["model", "training", "inference", "weights", "parameters", "neural", "ai system"],
-                "weight": 1.5
-            },
-            "Data Security": {
-                "terms": ["data", "dataset", "input", "output", "preprocessing", "validation"],
-                "weight": 1.3
-            },
-            "API Security": {
-                "terms": ["api", "endpoint", "request", "response", "http", "rest"],
-                "weight": 1.2
-            },
-            "Prompt Security": {
-                "terms": ["prompt", "instruction", "completion", "token", "generation"],
-                "weight": 1.4
-            }
-        }
+        # One scan finds the longest term starting at each position; shorter terms
+        # that are prefixes of it matched there too, so credit them as well
+        hits = Counter(match.group(1) for match in _CATEGORY_TERM_RE.finditer(text))
+        term_counts = Counter()
+        for term, count in hits.items():
+            for prefix in _CATEGORY_TERM_PREFIXES[term]:
+                term_counts[prefix] += count
         
         # Calculate category scores
-        category_scores = {}
-        for category, indicators in category_indicators.items():
-            score = sum(
-                indicators["weight"] * text.count(term)
-                for term in indicators["terms"]
-            )
-            category_scores[category] = score
+        category_scores = {
+            category: sum(indicators["weight"] * term_counts[term] for term in indicators["terms"])
+            for category, indicators in _CATEGORY_INDICATORS.items()
+        }
         
         # Return category with highest score, or General Security if no strong match
         max_score = max(category_scores.values())
@@ -315,6 +470,14 @@ class KnowledgeBase:
             return max(category_scores.items(), key=lambda x: x[1])[0]
         return "General Security"
     
+    async def _aload_patterns(self) -> None:
+        """Load security patterns from the JSON file without blocking the event loop."""
+        await asyncio.to_thread(self._load_patterns)
+
+    async def _asave_patterns(self) -> None:
+        """Save all patterns to the JSON file without blocking the event loop."""
+        await asyncio.to_thread(self._save_patterns)
+
     def _load_patterns(self) -> None:
         """Load security patterns from the JSON file."""
         try:
@@ -323,11 +486,9 @@ class KnowledgeBase:
                 self.patterns = {}
                 return
                 
-            with open(self.patterns_file, 'r') as f:
-                patterns_data = json.load(f)
-                for pattern_data in patterns_data:
-                    pattern = SecurityPattern(**pattern_data)
-                    self.patterns[pattern.id] = pattern
+            with open(self.patterns_file, 'rb') as f:
+                patterns = _PATTERNS_ADAPTER.validate_json(f.read())
+            self._put_patterns(patterns)
         except Exception as e:
             logger.error(f"Error loading patterns from file: {str(e)}")
             self.patterns = {}
@@ -338,22 +499,69 @@ class KnowledgeBase:
         data_dir = Path(self.patterns_file).parent
         data_dir.mkdir(parents=True, exist_ok=True)
         
-        # Use model_dump instead of dict for Pydantic v2 compatibility
-        patterns_data = [p.model_dump() for p in self.patterns.values()]
-        with open(self.patterns_file, 'w') as f:
-            json.dump(patterns_data, f, indent=2)
+        # Reuse the previous dump of a pattern unless it was replaced or re-added since
+        dumped = {}
+        for pattern_id, pattern in self.patterns.items():
+            cached = self._dumped.get(pattern_id)
+            if cached is None or cached[0] is not pattern or pattern_id in self._dirty:
+                cached = (pattern, orjson.dumps(pattern.model_dump(mode="json")))
+            dumped[pattern_id] = cached
+        self._dumped = dumped
+        self._dirty.clear()
+        
+        # Stream the array element by element rather than building one large document
+        with open(self.patterns_file, 'wb', buffering=1 << 20) as f:
+            f.write(b'[')
+            for i, (_, data) in enumerate(dumped.values()):
+                if i:
+                    f.write(b',')
+                f.write(data)
+            f.write(b']')
     
+    def _put_patterns(self, patterns: Iterable[SecurityPattern]) -> None:
+        """Insert patterns and file them under their category and source buckets."""
+        self._sync_index()
+        for pattern in patterns:
+            self.patterns[pattern.id] = pattern
+            self._index_pattern(pattern)
+
+    def _sync_index(self) -> None:
+        """Rebuild the buckets if the patterns dict was replaced wholesale."""
+        if self._indexed_patterns is self.patterns:
+            return
+        self._by_category = {}
+        self._by_source = {}
+        self._bucket_keys = {}
+        self._indexed_patterns = self.patterns
+        for pattern in self.patterns.values():
+            self._index_pattern(pattern)
+
+    def _index_pattern(self, pattern: SecurityPattern) -> None:
+        """File a pattern under its buckets, moving it out of the old ones if its keys changed."""
+        keys = (pattern.category, pattern.source)
+        previous = self._bucket_keys.get(pattern.id)
+        if previous is not None and previous != keys:
+            for buckets, key in ((self._by_category, previous[0]), (self._by_source, previous[1])):
+                del buckets[key][pattern.id]
+                if not buckets[key]:
+                    del buckets[key]
+        self._by_category.setdefault(pattern.category, {})[pattern.id] = pattern
+        self._by_source.setdefault(pattern.source, {})[pattern.id] = pattern
+        self._bucket_keys[pattern.id] = keys
+
     def get_pattern(self, pattern_id: str) -> Optional[SecurityPattern]:
         """Retrieve a specific security pattern by ID."""
         return self.patterns.get(pattern_id)
     
     def get_patterns_by_category(self, category: str) -> List[SecurityPattern]:
         """Retrieve all patterns in a specific category."""
-        return [p for p in self.patterns.values() if p.category == category]
+        self._sync_index()
+        return list(self._by_category.get(category, {}).values())
     
     def get_patterns_by_source(self, source: str) -> List[SecurityPattern]:
         """Retrieve all patterns from a specific source."""
-        return [p for p in self.patterns.values() if p.source == source]
+        self._sync_index()
+        return list(self._by_source.get(source, {}).values())
     
     async def refresh_patterns(self):
         """Refresh patterns from external sources."""
@@ -361,15 +569,10 @@ class KnowledgeBase:
 
     def add_pattern(self, pattern: SecurityPattern) -> None:
         """Add a new security pattern to the knowledge base."""
-        self.patterns[pattern.id] = pattern
+        self._put_patterns((pattern,))
+        self._dirty.add(pattern.id)
         self._save_patterns()
     
-    def _save_patterns(self) -> None:
-        """Save all patterns to the JSON file."""
-        patterns_data = [p.dict() for p in self.patterns.values()]
-        with open(self.patterns_file, 'w') as f:
-            json.dump(patterns_data, f, indent=2)
-
     def _extract_semantic_indicators(self, content: str, title: str, description: str) -> List[str]:
         """Extract semantic indicators from content."""
         indicators = set()
@@ -377,19 +580,13 @@ class KnowledgeBase:
         # Add key terms from title and description
         for text in [title, description]:
             # Extract meaningful phrases (2-3 words)
-            phrases = re.findall(r'\b\w+(?:\s+\w+){1,2}\b', text.lower())
-            indicators.update(phrases)
+            indicators.update(_PHRASE_RE.findall(text.lower()))
             
             # Extract technical terms
-            tech_terms = re.findall(r'\b[A-Za-z]+(?:[A-Z][a-z]*)*\b', text)
-            indicators.update(term.lower() for term in tech_terms)
+            indicators.update(term.lower() for term in _TECH_TERM_RE.findall(text))
         
-        # Extract domain-specific terminology
-        security_terms = re.findall(
-            r'\b(vulnerability|attack|exploit|security|risk|threat|protection|mitigation|defense)\b',
-            content.lower()
-        )
-        indicators.update(security_terms)
+        # Extract domain-specific terminology, collapsing repeats before lowercasing
+        indicators.update(term.lower() for term in set(_SECURITY_TERM_RE.findall(content)))
         
         return list(indicators)
 
@@ -398,37 +595,22 @@ class KnowledgeBase:
         rules = set()
         
         # Look for conditional statements and requirements
-        requirement_patterns = [
-            r'(?:must|should|needs? to|requires?|ensure)\s+([^.!?\n]+)',
-            r'if\s+([^,\n]+),\s*then\s+([^.!?\n]+)',
-            r'when\s+([^,\n]+),\s*([^.!?\n]+)',
-            r'(?:verify|validate|check)\s+([^.!?\n]+)'
-        ]
-        
-        for pattern in requirement_patterns:
-            matches = re.finditer(pattern, content, re.IGNORECASE)
-            for match in matches:
+        for pattern in _REQUIREMENT_RES:
+            for match in pattern.finditer(content):
                 rule = match.group(1).strip()
                 if any(indicator in rule.lower() for indicator in semantic_indicators):
                     rules.add(rule)
         
         return list(rules)
 
-    def _extract_context_around_block(self, section: str, block: str) -> str:
-        """Extract relevant context around a code block."""
-        # Find the block's position in the section
-        block_pos = section.find(block)
-        if block_pos == -1:
-            return ""
-        
+    def _extract_context_around_block(self, section: str, block_start: int, block_end: int) -> str:
+        """Extract relevant context around the code block spanning section[block_start:block_end]."""
         # Get some context before and after the block
-        context_start = max(0, block_pos - 200)
-        context_end = min(len(section), block_pos + len(block) + 200)
-        context = section[context_start:context_end]
+        context = section[max(0, block_start - 200):block_end + 200]
         
         # Clean up the context
-        context = re.sub(r'```[^`]+```', '', context)  # Remove other code blocks
-        context = re.sub(r'\s+', ' ', context)  # Normalize whitespace
+        context = _INLINE_CODE_BLOCK_RE.sub('', context)  # Remove other code blocks
+        context = _WHITESPACE_RE.sub(' ', context)  # Normalize whitespace
         
         return context.strip()
 
@@ -436,15 +618,14 @@ class KnowledgeBase:
         """Extract mitigation strategies with context awareness."""
         mitigation = ""
         
-        # Look for mitigation sections with various headers
-        mitigation_headers = ['mitigation', 'remediation', 'solution', 'prevention', 'countermeasures']
-        section_lower = section.lower()
+        # Look for mitigation sections with various headers, keeping the first occurrence of each
+        sections_by_header = {}
+        for match in _MITIGATION_RE.finditer(section):
+            sections_by_header.setdefault(match.group(1).lower(), match.group(2))
         
-        for header in mitigation_headers:
-            pattern = r'(?i)' + re.escape(header) + r':\s*(.*?)(?=\n\n|\Z)'
-            match = re.search(pattern, section, re.DOTALL)
-            if match:
-                mitigation = match.group(1).strip()
+        for header in _MITIGATION_HEADERS:
+            if header in sections_by_header:
+                mitigation = sections_by_header[header].strip()
                 break
         
         # If no explicit mitigation section found, try to extract from context
@@ -469,7 +650,7 @@ class KnowledgeBase:
         references = []
         
         # Look for references in the section
-        ref_section = re.search(r'(?i)(references|see also|related):\s*(.*?)(?=\n\n|\Z)', section, re.DOTALL)
+        ref_section = _REFERENCES_RE.search(section)
         if ref_section:
             ref_lines = ref_section.group(2).strip().split('\n')
             references = [ref.strip('* ') for ref in ref_lines if ref.strip()]
@@ -3,6 +3,7 @@ from fastapi_limiter.depends import RateLimiter
 import redis.asyncio as redis
 from app.core.config import settings
 import logging
+from functools import lru_cache
 from fastapi import Depends
 import os
 
@@ -18,7 +19,9 @@ async def init_rate_limiter():
         redis_client = redis.from_url(
             settings.REDIS_URL,
             encoding="utf-8",
-            decode_responses=True
+            decode_responses=True,
+            max_connections=settings.REDIS_POOL_SIZE,
+            socket_keepalive=True
         )
         await FastAPILimiter.init(redis_client)
         logger.info("Rate limiter initialized successfully")
@@ -31,6 +34,17 @@ async def init_rate_limiter():
 def is_redis_configured():
     return bool(os.getenv("REDIS_URL"))
 
+async def _rate_limit_disabled() -> None:
+    """No-op dependency used when rate limiting is off."""
+    return None
+
+_NO_RATE_LIMIT = Depends(_rate_limit_disabled)
+
+@lru_cache(maxsize=64)
+def _limiter(times: int, seconds: int) -> RateLimiter:
+    """Shared limiter per (times, seconds); keys are already scoped by route."""
+    return RateLimiter(times=times, seconds=seconds)
+
 # Rate limit decorators
 def rate_limit(requests: int = 60, period: int = 60):
     """
@@ -41,5 +55,5 @@ def rate_limit(requests: int = 60, period: int = 60):
         period: Time period in seconds
     """
     if settings.ENVIRONMENT == "development":
-        return lambda: None  # No-op in development
-    return Depends(RateLimiter(times=requests, seconds=period)) 
\ No newline at end of file
+        return _NO_RATE_LIMIT  # No-op in development
+    return Depends(_limiter(requests, period)) 
\ No newline at end of file
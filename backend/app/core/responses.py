@@ -0,0 +1,33 @@
+"""
+Response classes for Parseon API endpoints.
+"""
+
+from typing import Any
+import orjson
+from fastapi.responses import JSONResponse
+
+def _orjson_default(obj: Any) -> Any:
+    """Fallback for objects orjson cannot serialize natively (Pydantic models, enums)"""
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if hasattr(obj, "dict"):
+        return obj.dict()
+    if hasattr(obj, "value"):
+        return str(obj.value)
+    return str(obj)
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson in a single pass.
+    
+    Numpy scalars/arrays and datetimes are serialized natively in C, so payloads
+    do not need to be converted to Python types beforehand. Naive datetimes are
+    treated as UTC, matching the datetime.utcnow() timestamps used by services.
+    """
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_orjson_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+        )
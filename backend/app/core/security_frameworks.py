@@ -1,5 +1,6 @@
 from typing import Dict, List, Optional
 import aiohttp
+import asyncio
 import json
 import logging
 from pathlib import Path
@@ -22,16 +23,29 @@ class SecurityFrameworkManager:
         self.mitre_patterns: Dict[str, Dict] = {}
         self.cwe_patterns: Dict[str, Dict] = {}
         self.nist_patterns: Dict[str, Dict] = {}
+        # pattern_id -> framework ID, rebuilt whenever a framework is loaded
+        self._owasp_index: Dict[str, Optional[str]] = {}
+        self._mitre_index: Dict[str, Optional[str]] = {}
+        self._cwe_index: Dict[str, Optional[str]] = {}
+        self._nist_index: Dict[str, Optional[str]] = {}
         self.cache_dir = Path("cache/security_frameworks")
         self.cache_dir.mkdir(parents=True, exist_ok=True)
     
     async def initialize(self):
         """Initialize framework data from cache or fetch from sources."""
         try:
-            await self._load_owasp_patterns()
-            await self._load_mitre_patterns()
-            await self._load_cwe_patterns()
-            await self._load_nist_patterns()
+            # Cache files are independent, so read them concurrently
+            results = await asyncio.gather(
+                self._load_owasp_patterns(),
+                self._load_mitre_patterns(),
+                self._load_cwe_patterns(),
+                self._load_nist_patterns(),
+                return_exceptions=True
+            )
+            # Let every loader settle before falling back, so none writes after the reset
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
         except Exception as e:
             logger.error(f"Error initializing security frameworks: {str(e)}")
             # Initialize with empty patterns if loading fails
@@ -39,42 +53,51 @@ class SecurityFrameworkManager:
             self.mitre_patterns = {}
             self.cwe_patterns = {}
             self.nist_patterns = {}
+            self._owasp_index = {}
+            self._mitre_index = {}
+            self._cwe_index = {}
+            self._nist_index = {}
+    
+    @staticmethod
+    def _read_cache_file(cache_file: Path) -> Dict[str, Dict]:
+        """Read a framework cache file, or return no patterns if it has not been created yet."""
+        if not cache_file.exists():
+            return {}  # Initialize empty for now
+        with open(cache_file) as f:
+            return json.load(f)
+    
+    @staticmethod
+    def _build_index(patterns: Dict[str, Dict], mapping_key: str) -> Dict[str, Optional[str]]:
+        """Index a framework's patterns by pattern ID, keeping the first match as the scan did."""
+        index: Dict[str, Optional[str]] = {}
+        for pattern in patterns.values():
+            if "id" in pattern:
+                index.setdefault(pattern["id"], pattern.get(mapping_key))
+        return index
     
     async def _load_owasp_patterns(self):
         """Load OWASP LLM Top 10 patterns."""
         cache_file = self.cache_dir / "owasp_patterns.json"
-        if cache_file.exists():
-            with open(cache_file) as f:
-                self.owasp_patterns = json.load(f)
-        else:
-            self.owasp_patterns = {}  # Initialize empty for now
+        self.owasp_patterns = await asyncio.to_thread(self._read_cache_file, cache_file)
+        self._owasp_index = self._build_index(self.owasp_patterns, "owasp_id")
     
     async def _load_mitre_patterns(self):
         """Load MITRE ATT&CK patterns."""
         cache_file = self.cache_dir / "mitre_patterns.json"
-        if cache_file.exists():
-            with open(cache_file) as f:
-                self.mitre_patterns = json.load(f)
-        else:
-            self.mitre_patterns = {}  # Initialize empty for now
+        self.mitre_patterns = await asyncio.to_thread(self._read_cache_file, cache_file)
+        self._mitre_index = self._build_index(self.mitre_patterns, "mitre_id")
     
     async def _load_cwe_patterns(self):
         """Load CWE patterns."""
         cache_file = self.cache_dir / "cwe_patterns.json"
-        if cache_file.exists():
-            with open(cache_file) as f:
-                self.cwe_patterns = json.load(f)
-        else:
-            self.cwe_patterns = {}  # Initialize empty for now
+        self.cwe_patterns = await asyncio.to_thread(self._read_cache_file, cache_file)
+        self._cwe_index = self._build_index(self.cwe_patterns, "cwe_id")
     
     async def _load_nist_patterns(self):
         """Load NIST security patterns."""
         cache_file = self.cache_dir / "nist_patterns.json"
-        if cache_file.exists():
-            with open(cache_file) as f:
-                self.nist_patterns = json.load(f)
-        else:
-            self.nist_patterns = {}  # Initialize empty for now
+        self.nist_patterns = await asyncio.to_thread(self._read_cache_file, cache_file)
+        self._nist_index = self._build_index(self.nist_patterns, "nist_id")
     
     def get_framework_mapping(self, pattern_id: str) -> Optional[FrameworkMapping]:
         """Get framework mappings for a pattern."""
@@ -95,31 +118,19 @@ class SecurityFrameworkManager:
     
     def _find_owasp_mapping(self, pattern_id: str) -> Optional[str]:
         """Find OWASP mapping for a pattern."""
-        for pattern in self.owasp_patterns.values():
-            if pattern.get("id") == pattern_id:
-                return pattern.get("owasp_id")
-        return None
+        return self._owasp_index.get(pattern_id)
     
     def _find_mitre_mapping(self, pattern_id: str) -> Optional[str]:
         """Find MITRE ATT&CK mapping for a pattern."""
-        for pattern in self.mitre_patterns.values():
-            if pattern.get("id") == pattern_id:
-                return pattern.get("mitre_id")
-        return None
+        return self._mitre_index.get(pattern_id)
     
     def _find_cwe_mapping(self, pattern_id: str) -> Optional[str]:
         """Find CWE mapping for a pattern."""
-        for pattern in self.cwe_patterns.values():
-            if pattern.get("id") == pattern_id:
-                return pattern.get("cwe_id")
-        return None
+        return self._cwe_index.get(pattern_id)
     
     def _find_nist_mapping(self, pattern_id: str) -> Optional[str]:
         """Find NIST mapping for a pattern."""
-        for pattern in self.nist_patterns.values():
-            if pattern.get("id") == pattern_id:
-                return pattern.get("nist_id")
-        return None
+        return self._nist_index.get(pattern_id)
     
     async def refresh_frameworks(self):
         """Refresh all framework data from sources."""
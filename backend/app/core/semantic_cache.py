@@ -0,0 +1,127 @@
+"""
+Semantic cache for embedding-keyed results
+
+This module provides a small in-process cache that matches new queries against
+previously seen query embeddings, so paraphrased queries can reuse an earlier
+result instead of repeating the downstream lookup.
+"""
+
+from typing import Any, List, Optional
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class SemanticCache:
+    """
+    Fixed-size cache of (embedding, result) pairs looked up by cosine similarity.
+
+    Cached embeddings are stored pre-normalized in a single float32 matrix so a
+    lookup is one matrix-vector product followed by an argmax. With ``quantize``
+    enabled the matrix is stored as int8 codes with a per-row scale, cutting the
+    memory read per lookup by 4x. When the cache is full the least recently used
+    entry is replaced; storing a near-duplicate of a cached embedding overwrites it.
+    """
+
+    def __init__(self, dim: int, capacity: int = 256, threshold: float = 0.95, quantize: bool = False):
+        """Initialize an empty cache for embeddings of the given dimension"""
+        if capacity < 1:
+            raise ValueError(f"SemanticCache capacity must be at least 1, got {capacity}")
+        self.dim = dim
+        self.capacity = capacity
+        self.threshold = threshold
+        self.quantize = quantize
+
+        self._embeddings = np.zeros((capacity, dim), dtype=np.int8 if quantize else np.float32)
+        self._scales = np.zeros(capacity, dtype=np.float32)
+        self._results: List[Any] = [None] * capacity
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._size = 0
+        self._clock = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _normalize(self, embedding) -> Optional[np.ndarray]:
+        """Convert an embedding to a unit-length float32 vector"""
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        if vector.shape[0] != self.dim or norm == 0:
+            return None
+        return vector / norm
+
+    @staticmethod
+    def _quantize(vector: np.ndarray):
+        """Scale a vector into int8 codes, returning the codes and their scale"""
+        scale = float(np.max(np.abs(vector))) / 127.0
+        codes = np.round(vector / scale).astype(np.int8)
+        return codes, scale
+
+    def _similarities(self, query: np.ndarray) -> np.ndarray:
+        """Cosine similarities between the query and every cached embedding"""
+        if not self.quantize:
+            return self._embeddings[:self._size] @ query
+
+        # int32 accumulation avoids overflow for realistic embedding sizes
+        codes, scale = self._quantize(query)
+        dots = self._embeddings[:self._size].astype(np.int32) @ codes.astype(np.int32)
+        return dots * self._scales[:self._size] * scale
+
+    def _touch(self, slot: int) -> None:
+        """Mark a slot as most recently used"""
+        self._clock += 1
+        self._last_used[slot] = self._clock
+
+    def get(self, embedding) -> Optional[Any]:
+        """Return the cached result for the most similar embedding, if it is similar enough"""
+        if self._size == 0:
+            return None
+
+        query = self._normalize(embedding)
+        if query is None:
+            return None
+
+        similarities = self._similarities(query)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+
+        self._touch(best)
+        logger.debug(f"Semantic cache hit (similarity: {similarities[best]:.3f})")
+        return self._results[best]
+
+    def put(self, embedding, result: Any) -> None:
+        """Store a result, replacing a near-duplicate entry or evicting the least recently used one"""
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+
+        # Overwrite an entry that lookups would already match, so a refreshed result
+        # is not shadowed by the older one it replaces
+        best = -1
+        if self._size > 0:
+            similarities = self._similarities(vector)
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                best = -1
+
+        if best >= 0:
+            slot = best
+        elif self._size < self.capacity:
+            slot = self._size
+            self._size += 1
+        else:
+            slot = int(np.argmin(self._last_used))
+
+        if self.quantize:
+            self._embeddings[slot], self._scales[slot] = self._quantize(vector)
+        else:
+            self._embeddings[slot] = vector
+        self._results[slot] = result
+        self._touch(slot)
+
+    def clear(self) -> None:
+        """Remove all cached entries"""
+        self._results = [None] * self.capacity
+        self._last_used[:] = 0
+        self._size = 0
@@ -1,4 +1,5 @@
 from app.services.vector_store import VectorStore
+import asyncio
 import logging
 from app.core.config import settings
 
@@ -12,8 +13,14 @@ async def init_vector_store():
     global vector_store
     
     try:
-        # Initialize Vector Store
-        vector_store = VectorStore(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY)
+        # Initialize Vector Store; the client connects and ensures the HNSW-configured
+        # collection exists synchronously, so keep that off the event loop
+        vector_store = await asyncio.to_thread(
+            VectorStore,
+            url=settings.QDRANT_URL,
+            api_key=settings.QDRANT_API_KEY,
+            hnsw_ef=settings.VECTOR_SEARCH_HNSW_EF
+        )
         logger.info("VectorStore initialized successfully")
     except Exception as e:
         logger.error(f"Error initializing vector store: {str(e)}")
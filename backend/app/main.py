@@ -1,5 +1,6 @@
 from fastapi import FastAPI, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 import logging
 from datetime import datetime
 import os
@@ -10,11 +11,10 @@ from fastapi.responses import JSONResponse
 from app.api.v1.api import router as api_router
 from app.core.config import settings
 from app.core.exceptions import AssessmentError
-from app.services.assessment_service import SecurityAssessmentService, _base_analyzer, _embedding_service, _finding_validator
-from app.services.embeddings_service import EmbeddingsService
-from app.core.base_model_analyzer import BaseModelAnalyzer
-from app.core.finding_validator import FindingValidator
-from app.core.knowledge_base import KnowledgeBase
+from app.core.responses import ORJSONResponse
+from app.api.dependencies import get_assessment_service, get_embedding_service
+from app.core import vector_store_singleton
+from contextlib import asynccontextmanager
 import asyncio
 import signal
 import tempfile
@@ -43,13 +43,22 @@ os.environ["TRANSFORMERS_CACHE"] = os.path.join(TEMP_DIR, "transformers")
 os.environ["HF_HOME"] = os.path.join(TEMP_DIR, "huggingface")
 logger.info(f"Using temporary directory for caching: {TEMP_DIR}")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize shared services before serving requests and clean up on shutdown"""
+    await startup_event()
+    yield
+    await shutdown_event()
+
 # Create app first so health check always works
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.PROJECT_NAME,
     version=os.getenv("VERSION", "0.1.0"),
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # CORS setup
@@ -77,6 +86,9 @@ else:
         allow_headers=["*"],
     )
 
+# Compress large finding payloads (small responses such as health checks are sent as-is)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Try to import settings, but provide fallbacks if it fails
 try:
     from app.core.config import Settings
@@ -176,39 +188,23 @@ async def health_check_simple():
         "timestamp": str(datetime.now().isoformat())
     }
 
-# Early initialization of services to avoid cold start
-async def initialize_services():
-    """Initialize services during startup to avoid request-time delays"""
-    try:
-        global _base_analyzer, _embedding_service, _finding_validator
-        
-        # Initialize base analyzer if needed
-        if _base_analyzer is None:
-            logger.info("Pre-initializing BaseModelAnalyzer")
-            _base_analyzer = BaseModelAnalyzer()
-        
-        # Initialize embedding service first, as it's needed by the validator
-        if _embedding_service is None:
-            logger.info("Pre-initializing EmbeddingsService")
-            _embedding_service = EmbeddingsService()
-            await _embedding_service.initialize()
-        
-        # Initialize finding validator with simple knowledge base
-        if _finding_validator is None:
-            logger.info("Pre-initializing FindingValidator")
-            empty_kb = KnowledgeBase() 
-            _finding_validator = FindingValidator(knowledge_base=empty_kb)
-            await _finding_validator.initialize()
-            
-        logger.info("Service initialization complete")
-    except Exception as e:
-        logger.error(f"Error initializing services during startup: {str(e)}")
-
 # Setup graceful shutdown for Railway
 async def shutdown_event():
     """Clean up resources on application shutdown"""
     logger.info("Application shutdown in progress")
     
+    try:
+        from app.core.knowledge_base import close_session
+        await close_session()
+    except Exception as e:
+        logger.error(f"Error closing HTTP session: {str(e)}")
+    
+    try:
+        from app.services.assessment_service import close_shared_analyzer
+        await close_shared_analyzer()
+    except Exception as e:
+        logger.error(f"Error closing OpenAI client: {str(e)}")
+    
     try:
         # Clean up any temporary files
         if os.path.exists(TEMP_DIR):
@@ -219,7 +215,6 @@ async def shutdown_event():
     
     logger.info("Shutdown complete")
 
-@app.on_event("startup")
 async def startup_event():
     """Run initialization during startup"""
     logger.info("Application startup")
@@ -231,16 +226,21 @@ async def startup_event():
     from app.services.assessment_service import ANALYSIS_TIMEOUT, VALIDATION_TIMEOUT, API_CALL_TIMEOUT
     logger.info(f"Timeout settings: Analysis={ANALYSIS_TIMEOUT}s, Validation={VALIDATION_TIMEOUT}s, API={API_CALL_TIMEOUT}s")
     
-    await initialize_services()
+    # Eagerly build the shared assessment service (analyzer, embeddings, validator)
+    # so model loading happens once here rather than on the first request
+    try:
+        await get_embedding_service().initialize()
+        await get_assessment_service()
+        logger.info("Service initialization complete")
+    except Exception as e:
+        logger.error(f"Error initializing services during startup: {str(e)}")
     
-    # Pre-warm other services
-    assessment_service = SecurityAssessmentService()
-    await assessment_service._ensure_initialized()
-
-# Register shutdown event
-@app.on_event("shutdown")
-async def shutdown():
-    await shutdown_event()
+    # Create the shared vector store behind get_vector_store(); on failure the
+    # dependency keeps returning None and /search/similar responds with an error
+    try:
+        await vector_store_singleton.init_vector_store()
+    except Exception as e:
+        logger.error(f"Error initializing vector store during startup: {str(e)}")
 
 # For local development
 if __name__ == "__main__":
@@ -257,4 +257,4 @@ if __name__ == "__main__":
     signal.signal(signal.SIGINT, handle_sigterm)
     
     # Start the server
-    uvicorn.run("app.main:app", host=host, port=port, reload=os.getenv("ENVIRONMENT", "") == "development") 
\ No newline at end of file
+    uvicorn.run("app.main:app", host=host, port=port, reload=os.getenv("ENVIRONMENT", "") == "development", timeout_keep_alive=65) 
\ No newline at end of file
@@ -23,6 +23,10 @@ class ScanMode(str, Enum):
     PROMPT_SECURITY = "PROMPT_SECURITY"
     API_SECURITY = "API_SECURITY"
 
+# Integer sort codes for finding severities (unknown severities sort last)
+SEVERITY_CODES = {"CRITICAL": 0, "HIGH": 1, "MEDIUM": 2, "LOW": 3}
+UNKNOWN_SEVERITY_CODE = 4
+
 class VulnerabilityFinding(BaseModel):
     """Represents a security finding from pattern matching or AI analysis"""
     id: str = Field(..., description="Unique identifier for the finding")
@@ -35,25 +39,17 @@ class VulnerabilityFinding(BaseModel):
     confidence: float = Field(default=0.8, ge=0.0, le=1.0, description="Confidence score of the finding")
     validation_info: Optional[Dict[str, Any]] = Field(default=None, description="Additional validation information")
 
+    @property
+    def severity_code(self) -> int:
+        """Integer severity sort code (0 = CRITICAL, 4 = unknown), derived from the current severity"""
+        return SEVERITY_CODES.get(self.severity.upper(), UNKNOWN_SEVERITY_CODE)
+
 class SecurityScore(BaseModel):
     """Represents a security score for a specific category"""
     score: float = Field(..., ge=0.0, le=100.0, description="Score for this category")
     findings: List[str] = Field(default_factory=list, description="Key findings in this category")
     recommendations: List[str] = Field(default_factory=list, description="Recommendations for this category")
 
-    def dict(self, *args, **kwargs):
-        """Custom dict serialization"""
-        return {
-            "score": self.score,
-            "findings": self.findings,
-            "recommendations": self.recommendations
-        }
-
-    class Config:
-        json_encoders = {
-            'SecurityScore': lambda v: v.dict()
-        }
-
 class AssessmentResult(BaseModel):
     """Represents the complete results of a security assessment"""
     project_id: str = Field(..., description="Unique identifier for the assessment")
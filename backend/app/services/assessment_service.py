@@ -1,5 +1,6 @@
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Mapping, Optional
+from types import MappingProxyType
 import os
 from dotenv import load_dotenv
 from openai import AsyncOpenAI
@@ -13,13 +14,16 @@ from app.schemas.assessment import (
     ScanMode
 )
 from app.core.finding_validator import FindingValidator
-from app.core.base_model_analyzer import BaseModelAnalyzer
+from app.core.base_model_analyzer import BaseModelAnalyzer, request_token_usage
 from app.core.knowledge_base import KnowledgeBase
 import json
 import logging
 from pydantic import ValidationError
 import re
-from app.services.embeddings_service import EmbeddingsService
+import heapq
+import numpy as np
+from operator import attrgetter
+from app.services.embeddings_service import get_shared_embeddings_service
 from app.services.vector_store import VectorStore
 import asyncio
 
@@ -30,6 +34,51 @@ _embedding_service = None
 _base_analyzer = None
 _finding_validator = None
 
+async def close_shared_analyzer() -> None:
+    """Close the shared analyzer's HTTP client on application shutdown"""
+    global _base_analyzer
+    if _base_analyzer is not None:
+        await _base_analyzer.close()
+        _base_analyzer = None
+
+# Default category weights for overall score (COMPREHENSIVE scan mode)
+DEFAULT_CATEGORY_WEIGHTS = MappingProxyType({
+    SecurityCategory.API_SECURITY: 0.35,
+    SecurityCategory.PROMPT_SECURITY: 0.35,
+    SecurityCategory.CONFIGURATION: 0.15,
+    SecurityCategory.ERROR_HANDLING: 0.15
+})
+
+# Category weights for focused scan modes; other modes use the defaults
+MODE_CATEGORY_WEIGHTS = MappingProxyType({
+    ScanMode.API_SECURITY: MappingProxyType({
+        SecurityCategory.API_SECURITY: 0.60,
+        SecurityCategory.PROMPT_SECURITY: 0.20,
+        SecurityCategory.CONFIGURATION: 0.10,
+        SecurityCategory.ERROR_HANDLING: 0.10
+    }),
+    ScanMode.PROMPT_SECURITY: MappingProxyType({
+        SecurityCategory.API_SECURITY: 0.20,
+        SecurityCategory.PROMPT_SECURITY: 0.60,
+        SecurityCategory.CONFIGURATION: 0.10,
+        SecurityCategory.ERROR_HANDLING: 0.10
+    })
+})
+
+# Category weights as float vectors in a fixed SecurityCategory order, built once at import
+_CATEGORY_ORDER = tuple(SecurityCategory)
+
+def _weight_vector(category_weights: Mapping[SecurityCategory, float]) -> np.ndarray:
+    """Read-only weight vector aligned with _CATEGORY_ORDER"""
+    vector = np.array([category_weights.get(category, 0.0) for category in _CATEGORY_ORDER], dtype=np.float64)
+    vector.setflags(write=False)
+    return vector
+
+DEFAULT_CATEGORY_WEIGHT_VECTOR = _weight_vector(DEFAULT_CATEGORY_WEIGHTS)
+MODE_CATEGORY_WEIGHT_VECTORS = MappingProxyType({
+    mode: _weight_vector(category_weights) for mode, category_weights in MODE_CATEGORY_WEIGHTS.items()
+})
+
 # Configurable timeout settings with reasonable defaults
 ANALYSIS_TIMEOUT = int(os.getenv("ASSESSMENT_TIMEOUT_SECONDS", "60"))  # Default 60 seconds for total assessment
 VALIDATION_TIMEOUT = int(os.getenv("VALIDATION_TIMEOUT_SECONDS", "10"))  # Default 10 seconds for validation
@@ -64,14 +113,6 @@ class SecurityAssessmentService:
             RiskLevel.LOW: 1.0         # Increased from 0.3
         }
         
-        # Category weights for overall score
-        self.category_weights = {
-            SecurityCategory.API_SECURITY: 0.35,
-            SecurityCategory.PROMPT_SECURITY: 0.35,
-            SecurityCategory.CONFIGURATION: 0.15,
-            SecurityCategory.ERROR_HANDLING: 0.15
-        }
-        
         # Store initialized flag for lazy initialization
         self.initialized = False
     
@@ -93,7 +134,7 @@ class SecurityAssessmentService:
                 
                 # Initialize embedding service (only once)
                 if _embedding_service is None:
-                    _embedding_service = EmbeddingsService()
+                    _embedding_service = get_shared_embeddings_service()
                     await _embedding_service.initialize()
                 
                 # Initialize validator with existing embedding service
@@ -102,22 +143,15 @@ class SecurityAssessmentService:
             self.finding_validator = _finding_validator
             self.initialized = True
 
-    def _set_category_weights_for_mode(self, scan_mode: Optional[ScanMode]):
-        """Adjust category weights based on scan mode"""
-        if scan_mode == ScanMode.API_SECURITY:
-            self.category_weights = {
-                SecurityCategory.API_SECURITY: 0.60,
-                SecurityCategory.PROMPT_SECURITY: 0.20,
-                SecurityCategory.CONFIGURATION: 0.10,
-                SecurityCategory.ERROR_HANDLING: 0.10
-            }
-        elif scan_mode == ScanMode.PROMPT_SECURITY:
-            self.category_weights = {
-                SecurityCategory.API_SECURITY: 0.20,
-                SecurityCategory.PROMPT_SECURITY: 0.60,
-                SecurityCategory.CONFIGURATION: 0.10,
-                SecurityCategory.ERROR_HANDLING: 0.10
-            }
+    @staticmethod
+    def _category_weights_for_mode(scan_mode: Optional[ScanMode]) -> Mapping[SecurityCategory, float]:
+        """Category weights to use for a scan mode"""
+        return MODE_CATEGORY_WEIGHTS.get(scan_mode, DEFAULT_CATEGORY_WEIGHTS)
+
+    @staticmethod
+    def _category_weight_vector_for_mode(scan_mode: Optional[ScanMode]) -> np.ndarray:
+        """Precomputed category weight vector to use for a scan mode"""
+        return MODE_CATEGORY_WEIGHT_VECTORS.get(scan_mode, DEFAULT_CATEGORY_WEIGHT_VECTOR)
 
     async def analyze_input(self, assessment_input: SecurityAssessmentInput) -> SecurityAssessmentResult:
         """
@@ -136,6 +170,10 @@ class SecurityAssessmentService:
         """
         start_time = datetime.now()
         
+        # Collect this request's token usage; the shared analyzer adds to it from the analysis tasks
+        token_usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        usage_context = request_token_usage.set(token_usage)
+        
         try:
             # Set a reasonable timeout for this analysis
             analysis_timeout = ANALYSIS_TIMEOUT  # Use configurable timeout
@@ -149,9 +187,6 @@ class SecurityAssessmentService:
             # Validate input
             self._validate_input(assessment_input)
             
-            # Set category weights based on scan mode
-            self._set_category_weights_for_mode(assessment_input.scan_mode)
-            
             # Initialize findings lists
             all_findings = []
             
@@ -178,7 +213,7 @@ class SecurityAssessmentService:
                         break
                     
                     # Add task for code analysis
-                    task = self.base_analyzer.analyze_code(code, component)
+                    task = asyncio.create_task(self.base_analyzer.analyze_code(code, component))
                     tasks.append(task)
             
             # Process configs
@@ -201,41 +236,26 @@ class SecurityAssessmentService:
                         break
                     
                     # Add task for config analysis
-                    task = self.base_analyzer.analyze_config(content)
+                    task = asyncio.create_task(self.base_analyzer.analyze_config(content))
                     tasks.append(task)
             
-            # Run all analysis tasks in parallel with a timeout
+            # Run all analysis tasks in parallel with a global timeout, keeping
+            # whatever finished in time instead of discarding it with the rest
             if tasks:
-                try:
-                    # Use asyncio.wait_for to set a global timeout for all tasks
-                    findings_lists = await asyncio.wait_for(
-                        asyncio.gather(*tasks),
-                        timeout=analysis_timeout
-                    )
-                    
-                    # Combine all findings
-                    for findings in findings_lists:
-                        all_findings.extend(findings)
-                except asyncio.TimeoutError:
+                done, pending = await asyncio.wait(tasks, timeout=analysis_timeout)
+                if pending:
                     logger.warning(f"Analysis timed out after {analysis_timeout} seconds. Proceeding with partial results.")
-                    # Try to get any completed results
-                    for task in tasks:
-                        if task.done() and not task.exception():
-                            try:
-                                findings = task.result()
-                                all_findings.extend(findings)
-                            except Exception as e:
-                                logger.error(f"Error getting task result: {str(e)}")
-                except MemoryError:
-                    logger.error("Memory limit exceeded during analysis. Proceeding with partial results.")
-                    # Try to get any completed results
-                    for task in tasks:
-                        if task.done() and not task.exception():
-                            try:
-                                findings = task.result()
-                                all_findings.extend(findings)
-                            except Exception as e:
-                                logger.error(f"Error getting task result: {str(e)}")
+                    for task in pending:
+                        task.cancel()
+                
+                # Combine completed findings in submission order
+                for task in tasks:
+                    if task not in done:
+                        continue
+                    if task.exception() is not None:
+                        logger.error(f"Error getting task result: {str(task.exception())}")
+                        continue
+                    all_findings.extend(task.result())
             
             # Deduplicate findings based on title
             all_findings = self._deduplicate_findings(all_findings)
@@ -243,12 +263,8 @@ class SecurityAssessmentService:
             # Only validate findings if we have at least one
             # And limit to 20 max findings to validate to save time
             if all_findings:
-                # Sort by severity first
-                severity_order = {"CRITICAL": 0, "HIGH": 1, "MEDIUM": 2, "LOW": 3}
-                all_findings = sorted(
-                    all_findings,
-                    key=lambda f: severity_order.get(f.severity.upper(), 4)
-                )
+                # Sort by severity first (codes are derived from the normalized severity label)
+                all_findings = sorted(all_findings, key=attrgetter("severity_code"))
                 
                 # Take at most 20 findings to validate (prioritizing by severity)
                 findings_to_validate = all_findings[:20]
@@ -258,10 +274,14 @@ class SecurityAssessmentService:
                 # Use fast_mode if more than 10 findings to validate or if we've already spent a lot of time
                 use_fast_mode = len(findings_to_validate) > 10
                 try:
-                    validated_findings = await asyncio.wait_for(
-                        self.finding_validator.validate_findings(findings_to_validate, fast_mode=use_fast_mode),
-                        timeout=VALIDATION_TIMEOUT  # Use configurable timeout
-                    )
+                    if use_fast_mode:
+                        # Keyword validation is synchronous CPU work with nothing to time out on
+                        validated_findings = self.finding_validator.validate_findings_fast(findings_to_validate)
+                    else:
+                        validated_findings = await asyncio.wait_for(
+                            self.finding_validator.validate_findings(findings_to_validate),
+                            timeout=VALIDATION_TIMEOUT  # Use configurable timeout
+                        )
                     
                     # Replace the findings we validated
                     for i, finding in enumerate(validated_findings):
@@ -282,14 +302,21 @@ class SecurityAssessmentService:
             all_findings = [f for f in all_findings if not is_env_var_api_key_finding(f)]
             
             # Update token usage BEFORE creating the result
-            self.token_usage["prompt_tokens"] += self.base_analyzer.token_usage["prompt_tokens"]
-            self.token_usage["completion_tokens"] += self.base_analyzer.token_usage["completion_tokens"]
+            token_usage = dict(token_usage)  # Snapshot, so cancelled stragglers cannot change the result
+            self.token_usage["prompt_tokens"] += token_usage["prompt_tokens"]
+            self.token_usage["completion_tokens"] += token_usage["completion_tokens"]
+            
+            # Category weights for this request's scan mode (kept local, as the service is shared)
+            category_weights = self._category_weights_for_mode(assessment_input.scan_mode)
             
             # Calculate category scores first
-            category_scores = self._calculate_category_scores(all_findings)
+            category_scores = self._calculate_category_scores(all_findings, category_weights)
             
             # Then calculate overall score based on weighted category scores
-            overall_score = self._calculate_weighted_score(category_scores)
+            overall_score = self._calculate_weighted_score(
+                category_scores,
+                self._category_weight_vector_for_mode(assessment_input.scan_mode)
+            )
             
             # Calculate risk level based on the overall score
             risk_level = self._calculate_risk_level(overall_score)
@@ -305,7 +332,7 @@ class SecurityAssessmentService:
                 category_scores=category_scores,
                 priority_actions=self._prioritize_actions(all_findings),
                 ai_model_used=self.model,
-                token_usage=self.token_usage
+                token_usage=token_usage
             )
             
             # Calculate processing time
@@ -316,7 +343,7 @@ class SecurityAssessmentService:
             logger.info(f"Assessment result: score={assessment_result.overall_score}, risk level={assessment_result.overall_risk_level}")
             logger.info(f"Found {len(all_findings)} vulnerabilities across {len(assessment_result.category_scores)} categories")
             
-            logger.debug(f"Token usage: {self.token_usage['prompt_tokens']} prompt, {self.token_usage['completion_tokens']} completion")
+            logger.debug(f"Token usage: {token_usage['prompt_tokens']} prompt, {token_usage['completion_tokens']} completion")
             
             # Return the assessment result
             return assessment_result
@@ -349,6 +376,8 @@ class SecurityAssessmentService:
                 )
             # Re-raise the original exception
             raise
+        finally:
+            request_token_usage.reset(usage_context)
 
     def _validate_input(self, input_data: SecurityAssessmentInput) -> None:
         """Validate assessment input data"""
@@ -391,29 +420,35 @@ class SecurityAssessmentService:
         # Ensure score is between 0 and 100
         return max(0.0, min(100.0, base_score))
 
-    def _calculate_weighted_score(self, category_scores: Dict[SecurityCategory, SecurityScore]) -> float:
+    def _calculate_weighted_score(
+        self,
+        category_scores: Dict[SecurityCategory, SecurityScore],
+        weight_vector: np.ndarray = DEFAULT_CATEGORY_WEIGHT_VECTOR
+    ) -> float:
         """Calculate overall score based on weighted category scores"""
         if not category_scores:
             return 95.0  # No categories = excellent score
             
-        total_weight = 0.0
-        weighted_sum = 0.0
-        
-        # Calculate weighted sum of category scores
-        for category, score in category_scores.items():
-            weight = self.category_weights.get(category, 0.0)
-            total_weight += weight
-            weighted_sum += score.score * weight
+        # Gather scores in the weight vector's category order; categories without a
+        # score carry no weight
+        present = [category in category_scores for category in _CATEGORY_ORDER]
+        if all(present):
+            scores = np.array([category_scores[category].score for category in _CATEGORY_ORDER])
+            weights = weight_vector
+        else:
+            scores = np.array([category_scores[category].score for category in _CATEGORY_ORDER if category in category_scores])
+            weights = weight_vector[present]
+        total_weight = weights.sum()
         
         # If no weights, return simple average
         if total_weight == 0:
-            return sum(score.score for score in category_scores.values()) / len(category_scores)
+            return float(scores.mean())
             
         # Calculate weighted average
-        weighted_average = weighted_sum / total_weight
+        weighted_average = float(scores @ weights) / total_weight
         
         # Ensure score is between 0 and 100
-        return max(0.0, min(100.0, weighted_average))
+        return float(max(0.0, min(100.0, weighted_average)))
 
     def _calculate_risk_level(self, score: float) -> RiskLevel:
         """Calculate overall risk level based on score"""
@@ -426,7 +461,11 @@ class SecurityAssessmentService:
         else:
             return RiskLevel.CRITICAL
 
-    def _calculate_category_scores(self, findings: List[VulnerabilityFinding]) -> Dict[SecurityCategory, SecurityScore]:
+    def _calculate_category_scores(
+        self,
+        findings: List[VulnerabilityFinding],
+        category_weights: Mapping[SecurityCategory, float] = DEFAULT_CATEGORY_WEIGHTS
+    ) -> Dict[SecurityCategory, SecurityScore]:
         """Calculate scores for each security category"""
         category_scores = {}
         
@@ -435,7 +474,7 @@ class SecurityAssessmentService:
             category_scores[category] = SecurityScore(
                 category=category,
                 score=100.0,
-                weight=self.category_weights.get(category, 0.0)
+                weight=category_weights.get(category, 0.0)
             )
             
         # Track issues found separately
@@ -475,20 +514,12 @@ class SecurityAssessmentService:
         if not findings:
             return []
             
-        # Sort findings by severity and confidence
-        sorted_findings = sorted(
-            findings, 
-            key=lambda f: (
-                0 if f.severity == RiskLevel.CRITICAL else
-                1 if f.severity == RiskLevel.HIGH else
-                2 if f.severity == RiskLevel.MEDIUM else 3,
-                -f.confidence
-            )
-        )
+        # Select the top 5 findings by severity and confidence in a single pass
+        top_findings = heapq.nsmallest(5, findings, key=lambda f: (f.severity_code, -f.confidence))
         
-        # Create priority actions (limit to top 5)
+        # Create priority actions
         priority_actions = []
-        for i, finding in enumerate(sorted_findings[:5]):
+        for finding in top_findings:
             # Format as a string instead of dictionary
             action_string = f"[{finding.severity}] {finding.title}: {finding.recommendation}"
             priority_actions.append(action_string)
@@ -531,8 +562,12 @@ class SecurityAssessmentService:
 
     async def _store_vulnerabilities_in_vector_db(self, vector_store: VectorStore, vulnerabilities: List[VulnerabilityFinding]) -> None:
         """Store vulnerabilities in vector database for similarity search"""
+        global _embedding_service
         try:
-            embeddings_service = EmbeddingsService()
+            # Reuse the process-wide embedding service rather than loading another model
+            if _embedding_service is None:
+                _embedding_service = get_shared_embeddings_service()
+            embeddings_service = _embedding_service
             
             for vuln in vulnerabilities:
                 # Create text for embedding
@@ -1,8 +1,8 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+import asyncio
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from app.core.embeddings import MODEL_NAME, load_sentence_transformer, model_cache_id
 import redis
-import json
 import os
 from datetime import datetime
 import logging
@@ -16,6 +16,8 @@ logger = logging.getLogger(__name__)
 TEMP_DIR = os.environ.get("TEMP_DIR", "/tmp/parseon_cache")
 
 class EmbeddingsService:
+    MODEL_ID = MODEL_NAME
+    
     def __init__(self):
         # Initialize sentence transformer model
         self.model = None
@@ -55,8 +57,7 @@ class EmbeddingsService:
             if self.model is None:
                 # Load model with memory-efficient settings for Railway
                 logger.info("Loading sentence transformer model...")
-                self.model = SentenceTransformer(
-                    'all-MiniLM-L6-v2', 
+                self.model = load_sentence_transformer(
                     cache_folder=os.path.join(TEMP_DIR, "models"),
                     device="cpu"  # Force CPU to avoid GPU memory issues on Railway
                 )
@@ -83,29 +84,24 @@ class EmbeddingsService:
             return []
         
         # Process texts in batches to avoid memory issues
-        all_embeddings = []
         cache_hits = 0
         to_process = []
         to_process_indices = []
         
         # First check cache for each text
         if use_cache:
+            # Prepare results list with None placeholders
+            result = [None] * len(texts)
             for i, text in enumerate(texts):
                 cached = self._get_from_cache(text)
                 if cached is not None:
-                    # Cache hit, add the cached embedding
-                    all_embeddings.append(cached)
+                    # Cache hit, keep the embedding at the text's position
+                    result[i] = cached
                     cache_hits += 1
                 else:
                     # Cache miss, need to process
                     to_process.append(text)
                     to_process_indices.append(i)
-            
-            # Prepare results list with None placeholders
-            result = [None] * len(texts)
-            # Fill in cache hits
-            for i, emb in enumerate(all_embeddings):
-                result[i] = emb
         else:
             # No cache, process all
             to_process = texts
@@ -114,6 +110,12 @@ class EmbeddingsService:
         
         # Process texts that weren't in cache
         if to_process:
+            # Group texts of similar length so each batch pads to a similar size;
+            # results are written back through the original indices
+            by_length = sorted(range(len(to_process)), key=lambda k: len(to_process[k]))
+            to_process = [to_process[k] for k in by_length]
+            to_process_indices = [to_process_indices[k] for k in by_length]
+            
             # Process in smaller batches for memory efficiency
             smaller_batch_size = min(16, self.batch_size)  # Smaller batches for Railway deployment
             
@@ -122,10 +124,9 @@ class EmbeddingsService:
                 indices = to_process_indices[i:i+smaller_batch_size]
                 
                 try:
-                    # Generate embeddings for batch, ensuring we free memory after
-                    with torch.no_grad():
-                        embeddings = self.model.encode(batch, convert_to_tensor=True)
-                        embeddings = embeddings.cpu().numpy()
+                    # Generate embeddings for batch straight into a NumPy array
+                    with torch.inference_mode():
+                        embeddings = self.model.encode(batch, convert_to_numpy=True)
                     
                     # Save to cache and result
                     for j, (text, embedding) in enumerate(zip(batch, embeddings)):
@@ -133,17 +134,12 @@ class EmbeddingsService:
                             self._save_to_cache(text, embedding)
                         result[indices[j]] = embedding.tolist()
                         
-                    # Clear memory
-                    if hasattr(embeddings, 'detach'):
-                        del embeddings
-                        torch.cuda.empty_cache() if torch.cuda.is_available() else None
-                        
                 except Exception as e:
                     logger.error(f"Error generating batch embeddings: {str(e)}")
                     # Fall back to individual processing if batch fails
                     for j, text in enumerate(batch):
                         try:
-                            with torch.no_grad():
+                            with torch.inference_mode():
                                 embedding = self.model.encode(text, convert_to_tensor=False)
                             if use_cache:
                                 self._save_to_cache(text, embedding)
@@ -173,7 +169,7 @@ class EmbeddingsService:
         
         try:
             # Generate embedding using sentence-transformers
-            with torch.no_grad():
+            with torch.inference_mode():
                 embedding = self.model.encode(text, convert_to_tensor=False)
             
             if use_cache:
@@ -184,18 +180,22 @@ class EmbeddingsService:
             logger.error(f"Error getting embedding: {str(e)}")
             raise
     
+    def _cache_key(self, text: str) -> str:
+        """Build a content-hash cache key scoped to the embedding model"""
+        text_hash = hashlib.sha256(text.encode()).hexdigest()
+        return f"emb:{model_cache_id()}:{text_hash}"
+    
     def _get_from_cache(self, text: str) -> Optional[List[float]]:
         """Get embedding from Redis cache"""
         try:
-            # Use MD5 hash as key to avoid huge keys
-            text_hash = hashlib.md5(text.encode()).hexdigest()
-            cache_key = f"embedding:{text_hash}"
+            cache_key = self._cache_key(text)
             
             if self.redis_available:
                 try:
                     cached = self.redis.get(cache_key)
                     if cached:
-                        return json.loads(cached)
+                        # Stored as raw float32 bytes
+                        return np.frombuffer(cached, dtype=np.float32).tolist()
                 except (redis.ConnectionError, redis.TimeoutError) as e:
                     logger.warning(f"Redis connection error when getting from cache: {str(e)}")
                     self.redis_available = False  # Fallback to memory cache
@@ -212,33 +212,29 @@ class EmbeddingsService:
     def _save_to_cache(self, text: str, embedding: List[float]):
         """Save embedding to Redis cache"""
         try:
-            # Convert ndarray to list if necessary
-            if hasattr(embedding, 'tolist'):
-                embedding = embedding.tolist()
-                
-            # Use MD5 hash as key to avoid huge keys
-            text_hash = hashlib.md5(text.encode()).hexdigest()
-            cache_key = f"embedding:{text_hash}"
+            vector = np.asarray(embedding, dtype=np.float32)
+            cache_key = self._cache_key(text)
             
             if self.redis_available:
                 try:
+                    # float32 bytes are ~4x smaller than the JSON encoding
                     self.redis.setex(
                         cache_key,
                         self.cache_ttl,
-                        json.dumps(embedding)
+                        vector.tobytes()
                     )
                 except (redis.ConnectionError, redis.TimeoutError) as e:
                     logger.warning(f"Redis connection error when saving to cache: {str(e)}")
                     self.redis_available = False  # Fallback to memory cache
                     # Save to memory cache as fallback
-                    self.memory_cache[cache_key] = embedding
+                    self.memory_cache[cache_key] = vector.tolist()
                 except Exception as e:
                     logger.warning(f"Redis error when saving: {str(e)}")
                     # Save to memory cache as fallback
-                    self.memory_cache[cache_key] = embedding
+                    self.memory_cache[cache_key] = vector.tolist()
             else:
                 # Use in-memory cache if Redis not available
-                self.memory_cache[cache_key] = embedding
+                self.memory_cache[cache_key] = vector.tolist()
         except Exception as e:
             logger.warning(f"Cache save error: {str(e)}")
     
@@ -269,4 +265,90 @@ class EmbeddingsService:
                     "similarity": float(similarity)
                 })
         
-        return sorted(results, key=lambda x: x["similarity"], reverse=True) 
\ No newline at end of file
+        return sorted(results, key=lambda x: x["similarity"], reverse=True)
+
+
+# Process-wide embeddings service so the model is loaded once and shared
+_shared_embeddings_service: Optional[EmbeddingsService] = None
+
+def get_shared_embeddings_service() -> EmbeddingsService:
+    """Return the process-wide EmbeddingsService, creating it on first use"""
+    global _shared_embeddings_service
+    if _shared_embeddings_service is None:
+        _shared_embeddings_service = EmbeddingsService()
+    return _shared_embeddings_service
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent single-text embedding requests into batched model calls.
+
+    Requests are queued and a background task drains the queue, waiting up to
+    ``max_wait_ms`` (or until ``max_batch`` texts are pending) before running a
+    single ``generate_embeddings_batch`` call and fanning the vectors back out.
+    """
+
+    def __init__(self, embeddings_service: EmbeddingsService, max_batch: int = 32, max_wait_ms: float = 10.0):
+        self.embeddings_service = embeddings_service
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: Optional["asyncio.Queue[Tuple[str, asyncio.Future]]"] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def _ensure_worker(self) -> None:
+        """Start the background drain task on the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._drain())
+
+    async def embed_coalesced(self, text: str) -> np.ndarray:
+        """Embed a single text, sharing a model call with any concurrent requests"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _drain(self) -> None:
+        """Collect pending requests into batches and resolve their futures"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                embeddings = await self.embeddings_service.generate_embeddings_batch(texts)
+                # A short result would leave some callers waiting forever, so fail the whole batch
+                if len(embeddings) != len(texts):
+                    raise RuntimeError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+            except Exception as e:
+                logger.error(f"Error generating coalesced embeddings: {str(e)}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            logger.debug(f"Embedded {len(texts)} coalesced queries in one batch")
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(np.asarray(embedding, dtype=np.float32))
+
+    async def close(self) -> None:
+        """Stop the background drain task"""
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+        self._queue = None
@@ -1,7 +1,7 @@
 from typing import List, Dict, Any, Optional
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
-from qdrant_client.http.models import Distance, VectorParams
+from qdrant_client.http.models import Distance, VectorParams, HnswConfigDiff, SearchParams
 import logging
 from datetime import datetime
 
@@ -20,7 +20,11 @@ class VectorStore:
     COLLECTION_NAME = "security_assessments"
     VECTOR_SIZE = 384  # Size of all-MiniLM-L6-v2 embeddings
     
-    def __init__(self, url: str = None, host: str = "localhost", port: int = 6333, api_key: str = None):
+    # HNSW graph parameters used when the collection is created
+    HNSW_M = 16
+    HNSW_EF_CONSTRUCT = 64
+    
+    def __init__(self, url: str = None, host: str = "localhost", port: int = 6333, api_key: str = None, hnsw_ef: int = 100):
         """
         Initialize the vector store with Qdrant client.
         Args:
@@ -28,7 +32,9 @@ class VectorStore:
             host: Qdrant server host (for local)
             port: Qdrant server port (for local)
             api_key: Qdrant API key (for cloud)
+            hnsw_ef: HNSW search beam width (higher trades latency for recall)
         """
+        self.search_params = SearchParams(hnsw_ef=hnsw_ef, exact=False)
         try:
             if url:
                 if api_key:
@@ -57,6 +63,10 @@ class VectorStore:
                     vectors_config=VectorParams(
                         size=self.VECTOR_SIZE,
                         distance=Distance.COSINE
+                    ),
+                    hnsw_config=HnswConfigDiff(
+                        m=self.HNSW_M,
+                        ef_construct=self.HNSW_EF_CONSTRUCT
                     )
                 )
                 logger.info(f"Created collection: {self.COLLECTION_NAME}")
@@ -125,7 +135,8 @@ class VectorStore:
                 collection_name=self.COLLECTION_NAME,
                 query_vector=query_embedding,
                 limit=limit,
-                score_threshold=score_threshold
+                score_threshold=score_threshold,
+                search_params=self.search_params
             )
             
             results = []
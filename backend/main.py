@@ -55,4 +55,4 @@ if __name__ == "__main__":
     host = os.getenv("HOST", "0.0.0.0")
     reload_mode = os.getenv("ENVIRONMENT", "development") == "development"
     logger.info(f"Starting uvicorn server on {host}:{port}")
-    uvicorn.run("main:app", host=host, port=port, reload=reload_mode) 
\ No newline at end of file
+    uvicorn.run("main:app", host=host, port=port, reload=reload_mode, timeout_keep_alive=65) 
\ No newline at end of file
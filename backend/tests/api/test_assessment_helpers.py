@@ -0,0 +1,225 @@
+import numpy as np
+import pytest
+from app.api.v1.endpoints import assessment
+from app.core.semantic_cache import SemanticCache
+
+
+async def test_query_embedding_is_cached(monkeypatch):
+    """Repeated search queries should only be embedded once"""
+    calls = []
+
+    async def fake_batch(texts, use_cache=True):
+        calls.append(list(texts))
+        return [[0.1, 0.2, 0.3] for _ in texts]
+
+    from app.api import dependencies
+
+    monkeypatch.setattr(dependencies.get_embedding_service(), "generate_embeddings_batch", fake_batch)
+    assessment._query_embedding_cache.clear()
+    batcher = dependencies.get_query_batcher()
+
+    first = await assessment._embed_query("prompt injection", batcher)
+    second = await assessment._embed_query("prompt injection", batcher)
+
+    assert first is second
+    assert first.tolist() == pytest.approx([0.1, 0.2, 0.3])
+    assert calls == [["prompt injection"]]
+    assessment._query_embedding_cache.clear()
+    await batcher.close()
+
+
+def test_orjson_response_serializes_numpy_and_models():
+    """Numpy scalars, datetimes and Pydantic models render without a Python pre-pass"""
+    import orjson
+    from app.core.responses import ORJSONResponse
+    from app.schemas.assessment import SecurityScore
+
+    from datetime import datetime
+
+    response = ORJSONResponse(content={
+        "score": np.float32(0.5),
+        "validated": np.bool_(True),
+        "category": SecurityScore(score=90.0),
+        "created_at": datetime(2024, 1, 1)
+    })
+
+    assert orjson.loads(response.body) == {
+        "score": 0.5,
+        "validated": True,
+        "category": {"score": 90.0, "findings": [], "recommendations": []},
+        "created_at": "2024-01-01T00:00:00+00:00"
+    }
+
+
+def _make_result(vulnerabilities):
+    from datetime import datetime
+    from app.schemas.assessment import SecurityAssessmentResult, SecurityScore, RiskLevel
+
+    return SecurityAssessmentResult(
+        organization_name="Test Org",
+        project_name="Test Project",
+        timestamp=datetime(2024, 1, 1),
+        overall_score=72.5,
+        overall_risk_level=RiskLevel.MEDIUM,
+        category_scores={"API_SECURITY": SecurityScore(score=60.0, findings=["Missing rate limiting"])},
+        vulnerabilities=vulnerabilities,
+        priority_actions=[],
+        ai_model_used="gpt-3.5-turbo",
+        token_usage={"prompt_tokens": 0, "completion_tokens": 0}
+    )
+
+
+def _make_finding(finding_id, severity, confidence):
+    from app.schemas.assessment import VulnerabilityFinding
+
+    return VulnerabilityFinding(
+        id=finding_id,
+        title=f"Finding {finding_id}",
+        description="Description",
+        severity=severity,
+        category="API_SECURITY",
+        recommendation="Fix it",
+        confidence=confidence
+    )
+
+
+def test_transform_orders_findings_by_severity_then_confidence():
+    """Findings are ordered by severity, then by descending confidence"""
+    result = _make_result([
+        _make_finding("low", "LOW", 0.9),
+        _make_finding("high-weak", "high", 0.6),
+        _make_finding("unknown", "INFO", 1.0),
+        _make_finding("critical", "CRITICAL", 0.7),
+        _make_finding("high-strong", "HIGH", 0.95),
+    ])
+
+    transformed = assessment._transform_assessment_result(result)
+
+    assert [f["id"] for f in transformed["vulnerabilities"]] == [
+        "critical", "high-strong", "high-weak", "low", "unknown"
+    ]
+    assert transformed["vulnerabilities"][2]["severity"] == "HIGH"
+    assert transformed["summary"].endswith("Found 1 critical and 2 high severity issues.")
+    assert transformed["category_scores"]["API_SECURITY"]["score"] == 60.0
+    assert transformed["category_scores"]["PROMPT_SECURITY"] == {
+        "score": 100.0, "findings": [], "recommendations": []
+    }
+
+
+def test_transform_handles_no_findings():
+    """An assessment without findings still produces a summary"""
+    transformed = assessment._transform_assessment_result(_make_result([]))
+
+    assert transformed["vulnerabilities"] == []
+    assert transformed["summary"] == "Security assessment for Test Project completed with 0 findings."
+
+
+def test_get_vector_store_returns_singleton(monkeypatch):
+    """The vector store dependency resolves to the startup-initialized singleton"""
+    from app.api import dependencies
+    from app.core import vector_store_singleton
+
+    sentinel = object()
+    monkeypatch.setattr(vector_store_singleton, "vector_store", sentinel)
+
+    assert dependencies.get_vector_store() is sentinel
+
+
+def test_finding_severity_code_is_not_serialized():
+    """The precomputed severity code is available but stays out of the payload"""
+    finding = _make_finding("f1", "high", 0.5)
+
+    assert finding.severity_code == 1
+    assert _make_finding("f2", "INFO", 0.5).severity_code == 4
+    assert "severity_code" not in finding.model_dump()
+
+
+class _FakeBatcher:
+    async def embed_coalesced(self, text):
+        return np.array([1.0, 0.0, 0.0], dtype=np.float32)
+
+
+def _search(results):
+    """POST a search query with the embedding and vector store dependencies faked out"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.api import dependencies
+
+    class FakeVectorStore:
+        async def search_similar(self, query_embedding, limit=5, score_threshold=0.7):
+            return results
+
+    app.dependency_overrides[dependencies.get_query_batcher] = _FakeBatcher
+    app.dependency_overrides[dependencies.get_vector_store] = FakeVectorStore
+    assessment._query_embedding_cache.clear()
+    try:
+        return TestClient(app).post("/api/v1/search/similar", json={"query": "injection"})
+    finally:
+        app.dependency_overrides.clear()
+        assessment._query_embedding_cache.clear()
+
+
+def _search_result(doc_id):
+    from datetime import datetime
+
+    return {
+        "id": doc_id,
+        "score": np.float32(0.875),
+        "content": "Prompt injection in chat endpoint",
+        "metadata": {"title": "Prompt injection", "severity": "HIGH", "category": "PROMPT_SECURITY", "confidence": 0.9},
+        "created_at": datetime(2024, 1, 1)
+    }
+
+
+def test_search_similar_returns_orjson_response():
+    """Search results are rendered by orjson without response-model revalidation"""
+    response = _search([_search_result("doc-1")])
+
+    assert response.status_code == 200
+    assert response.json() == [{
+        "id": "doc-1",
+        "title": "Prompt injection",
+        "severity": "HIGH",
+        "category": "PROMPT_SECURITY",
+        "confidence": 0.9,
+        "content": "Prompt injection in chat endpoint",
+        "similarity_score": 0.875,
+        "created_at": "2024-01-01T00:00:00"
+    }]
+
+
+def test_large_responses_are_gzip_compressed():
+    """Payloads above the minimum size are gzip-encoded for clients that accept it"""
+    response = _search([_search_result(f"doc-{i}") for i in range(20)])
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()) == 20
+
+
+def test_finding_severity_code_follows_severity_changes():
+    """The severity code tracks the severity after copies and assignments"""
+    finding = _make_finding("f1", "high", 0.5)
+
+    assert finding.model_copy(update={"severity": "LOW"}).severity_code == 3
+    finding.severity = "critical"
+    assert finding.severity_code == 0
+
+
+def test_search_cache_entries_expire(monkeypatch):
+    """Cached search results are only served until CACHE_TTL elapses"""
+    from types import SimpleNamespace
+    from app.core.config import settings
+
+    cache = SemanticCache(dim=3, capacity=4, threshold=0.95)
+    monkeypatch.setattr(assessment, "_search_cache", cache)
+    monkeypatch.setattr(settings, "CACHE_TTL", 60)
+    now = [1000.0]
+    monkeypatch.setattr(assessment, "time", SimpleNamespace(monotonic=lambda: now[0]))
+
+    first = _search([_search_result("doc-1")])
+    assert _search([]).json() == first.json()
+
+    now[0] += 61
+    assert _search([]).json() == []
+    assert len(cache) == 1
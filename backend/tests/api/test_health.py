@@ -0,0 +1,20 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.config import settings
+
+
+def test_health_endpoints_return_prerendered_payload():
+    """Both stateless health routes serve the same pre-rendered JSON"""
+    client = TestClient(app)
+    expected = {
+        "status": "healthy",
+        "version": settings.VERSION,
+        "environment": settings.ENVIRONMENT,
+        "database": "not_configured"
+    }
+
+    for path in ("/api/v1/health/", "/api/v1/health/health"):
+        response = client.get(path)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        assert response.json() == expected
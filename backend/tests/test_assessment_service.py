@@ -0,0 +1,115 @@
+import asyncio
+import pytest
+from app.services import assessment_service
+from app.services.assessment_service import SecurityAssessmentService
+from app.schemas.assessment import VulnerabilityFinding
+from app.schemas.assessment_input import SecurityAssessmentInput
+
+
+class FakeAnalyzer:
+    """Returns one finding per code component; the "slow" component never finishes in time"""
+
+    def __init__(self):
+        self.token_usage = {"prompt_tokens": 0, "completion_tokens": 0}
+
+    async def analyze_code(self, code, component):
+        if component == "slow":
+            await asyncio.sleep(5)
+        return [VulnerabilityFinding(
+            id=component, title=component, description="Description", severity="HIGH",
+            category="API_SECURITY", recommendation="Fix it"
+        )]
+
+    async def analyze_config(self, config):
+        raise RuntimeError("analysis failed")
+
+
+class PassthroughValidator:
+    async def validate_findings(self, findings, fast_mode=False):
+        return findings
+
+
+async def test_analysis_keeps_completed_results_on_timeout(monkeypatch):
+    """Findings from analyses that finished before the timeout are kept"""
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(assessment_service, "ANALYSIS_TIMEOUT", 0.2)
+    service = SecurityAssessmentService()
+    service.initialized = True
+    service.base_analyzer = FakeAnalyzer()
+    service.finding_validator = PassthroughValidator()
+
+    result = await service.analyze_input(SecurityAssessmentInput(
+        organization_name="Test Org",
+        project_name="Test Project",
+        ai_provider="openai",
+        implementation_details={"fast": "x" * 20, "slow": "y" * 20},
+        configs={"env_file": "MAX_TOKENS=None" * 2},
+        architecture_description="Simple API"
+    ))
+
+    assert [f.title for f in result.vulnerabilities] == ["fast"]
+
+
+class UsageAnalyzer(FakeAnalyzer):
+    """Records a distinct token count per component, interleaving with other requests"""
+    from app.core.base_model_analyzer import BaseModelAnalyzer
+    _record_usage = BaseModelAnalyzer._record_usage
+
+    async def analyze_code(self, code, component):
+        await asyncio.sleep(0.01)
+        self._record_usage(len(code), 1)
+        await asyncio.sleep(0.01)
+        return []
+
+
+async def test_token_usage_is_reported_per_request(monkeypatch):
+    """Overlapping requests on the shared service each report only their own tokens"""
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    service = SecurityAssessmentService()
+    service.initialized = True
+    service.base_analyzer = UsageAnalyzer()
+    service.finding_validator = PassthroughValidator()
+
+    def make_input(size):
+        return SecurityAssessmentInput(
+            organization_name="Test Org",
+            project_name="Test Project",
+            ai_provider="openai",
+            implementation_details={"a": "x" * size, "b": "y" * size},
+            configs={},
+            architecture_description="Simple API"
+        )
+
+    small, large = await asyncio.gather(
+        service.analyze_input(make_input(20)),
+        service.analyze_input(make_input(500))
+    )
+
+    assert small.token_usage == {"prompt_tokens": 40, "completion_tokens": 2}
+    assert large.token_usage == {"prompt_tokens": 1000, "completion_tokens": 2}
+    assert service.base_analyzer.token_usage == {"prompt_tokens": 1040, "completion_tokens": 4}
+
+
+def test_scan_mode_weights_do_not_touch_shared_state(monkeypatch):
+    """Scan-mode weights are computed per call instead of stored on the shared service"""
+    from app.schemas.assessment import ScanMode, SecurityCategory
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    service = SecurityAssessmentService()
+    from app.schemas.assessment import SecurityScore
+
+    scores = {
+        SecurityCategory.API_SECURITY: SecurityScore(score=0.0),
+        SecurityCategory.PROMPT_SECURITY: SecurityScore(score=100.0),
+    }
+    weights = service._category_weight_vector_for_mode(ScanMode.API_SECURITY)
+
+    assert service._calculate_weighted_score(scores, weights) == pytest.approx(25.0)
+    assert service._calculate_weighted_score(scores) == pytest.approx(50.0)
+    assert service._category_weights_for_mode(None) is assessment_service.DEFAULT_CATEGORY_WEIGHTS
+    assert service._category_weight_vector_for_mode(None) is assessment_service.DEFAULT_CATEGORY_WEIGHT_VECTOR
+    assert service._calculate_weighted_score(
+        {category: SecurityScore(score=100.0 if category == SecurityCategory.API_SECURITY else 0.0) for category in SecurityCategory},
+        weights
+    ) == pytest.approx(60.0)
+    assert not hasattr(service, "category_weights")
@@ -0,0 +1,232 @@
+import pytest
+from app.core.base_model_analyzer import BaseModelAnalyzer
+
+
+class _FakeStream:
+    """Async iterator standing in for a streamed chat completion"""
+
+    def __init__(self, text, usage=None):
+        self.chunks = [text]
+        self.usage = usage
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.chunks:
+            delta = type("Delta", (), {"content": self.chunks.pop()})()
+            return type("Chunk", (), {"choices": [type("Choice", (), {"delta": delta})()], "usage": None})()
+        if self.usage is not None:
+            # Usage arrives on a final chunk without choices
+            usage, self.usage = self.usage, None
+            return type("Chunk", (), {"choices": [], "usage": usage})()
+        raise StopAsyncIteration
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    return BaseModelAnalyzer()
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("API", "API_SECURITY"),
+    ("prompt injection", "PROMPT_SECURITY"),
+    ("Insecure Configuration", "CONFIGURATION"),
+    ("error handling", "ERROR_HANDLING"),
+    ("Data Leakage", "GENERAL_SECURITY"),
+])
+def test_normalize_category(analyzer, raw, expected):
+    """Free-form LLM categories map onto the standard categories"""
+    assert analyzer._normalize_category(raw) == expected
+
+
+def test_parse_findings_from_findings_object(analyzer):
+    """A JSON object with a findings list is parsed into findings"""
+    findings = analyzer._parse_findings(
+        '{"findings": [{"title": "Prompt injection", "description": "User input is forwarded", '
+        '"severity": "high", "category": "prompt", "code_snippet": "prompt = input", '
+        '"recommendation": "Sanitize input"}]}'
+    )
+
+    assert len(findings) == 1
+    assert findings[0].severity == "HIGH"
+    assert findings[0].category == "PROMPT_SECURITY"
+    assert findings[0].code_snippets == ["prompt = input"]
+    assert findings[0].confidence == 0.8
+
+
+def test_parse_findings_rejects_invalid_json(analyzer):
+    """Unparseable responses produce no findings"""
+    assert analyzer._parse_findings("not json") == []
+
+
+async def test_identical_prompts_reuse_cached_response(analyzer, monkeypatch):
+    """A repeated prompt is served from the response cache without another LLM call"""
+    calls = []
+
+    async def fake_create(**kwargs):
+        calls.append(kwargs)
+        return _FakeStream('{"findings": [{"title": "Missing rate limit", "severity": "LOW", "category": "API"}]}')
+
+    monkeypatch.setattr(analyzer.client.chat.completions, "create", fake_create)
+
+    first = await analyzer._analyze_with_llm("system", "user")
+    second = await analyzer._analyze_with_llm("system", "user")
+
+    assert len(calls) == 1
+    assert [f.title for f in first] == [f.title for f in second] == ["Missing rate limit"]
+    assert first[0] is not second[0]
+
+
+async def test_streamed_usage_is_recorded(analyzer, monkeypatch):
+    """Token usage reported on the final stream chunk replaces the length estimate"""
+    usage = type("Usage", (), {"prompt_tokens": 120, "completion_tokens": 30})()
+
+    async def fake_create(**kwargs):
+        assert kwargs["stream_options"] == {"include_usage": True}
+        return _FakeStream('{"findings": [{"title": "Missing rate limit", "category": "API"}]}', usage)
+
+    monkeypatch.setattr(analyzer.client.chat.completions, "create", fake_create)
+
+    findings = await analyzer._analyze_with_llm("system", "user")
+
+    assert [f.title for f in findings] == ["Missing rate limit"]
+    assert analyzer.token_usage == {"prompt_tokens": 120, "completion_tokens": 30}
+
+
+def test_parse_findings_extracts_embedded_array(analyzer):
+    """A findings array wrapped in prose is extracted and parsed"""
+    findings = analyzer._parse_findings(
+        'Here are the findings:\n[{"title": "Verbose errors", "category": "error handling"}]\nDone.'
+    )
+
+    assert [(f.title, f.category, f.severity) for f in findings] == [
+        ("Verbose errors", "ERROR_HANDLING", "MEDIUM")
+    ]
+
+
+@pytest.mark.parametrize("item, expected", [
+    ({}, 0.8),
+    ({"recommendation": "r" * 51}, 0.85),
+    ({"recommendation": "r" * 51, "description": "d" * 101}, 0.9),
+    ({"recommendation": None, "description": None}, 0.8),
+])
+def test_calculate_confidence(analyzer, item, expected):
+    """Detailed recommendations and descriptions raise confidence"""
+    assert analyzer._calculate_confidence(item) == pytest.approx(expected)
+
+
+async def test_analyze_code_batch_bounds_concurrency(analyzer, monkeypatch):
+    """Batched calls run concurrently up to the limit and keep input order"""
+    import asyncio
+
+    analyzer._request_semaphore = asyncio.Semaphore(2)
+    in_flight = []
+    peak = []
+
+    async def fake_create(**kwargs):
+        in_flight.append(1)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.pop()
+        context = kwargs["messages"][1]["content"].rsplit("Context: ", 1)[1]
+        return _FakeStream('{"findings": [{"title": "%s", "category": "API"}]}' % context)
+
+    monkeypatch.setattr(analyzer.client.chat.completions, "create", fake_create)
+
+    results = await analyzer.analyze_code_batch([(f"code_{i} = call()", f"component-{i}") for i in range(5)])
+
+    assert [[f.title for f in findings] for findings in results] == [[f"component-{i}"] for i in range(5)]
+    assert max(peak) == 2
+
+
+async def test_request_throttle_waits_for_budget(monkeypatch):
+    """Requests beyond the per-minute budget wait for the bucket to refill"""
+    from app.core import base_model_analyzer
+
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        throttle._last_refill -= seconds
+
+    monkeypatch.setattr(base_model_analyzer.asyncio, "sleep", fake_sleep)
+    throttle = base_model_analyzer._RequestThrottle(requests_per_minute=60, tokens_per_minute=1000)
+
+    await throttle.acquire(600)
+    await throttle.acquire(600)
+
+    assert len(sleeps) == 1
+    assert sleeps[0] == pytest.approx(12.0, abs=0.1)
+
+
+async def test_request_throttle_treats_non_positive_limits_as_unlimited(monkeypatch):
+    """A limit of 0 or less disables that budget instead of dividing by zero"""
+    from app.core import base_model_analyzer
+
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        throttle._last_refill -= seconds
+
+    monkeypatch.setattr(base_model_analyzer.asyncio, "sleep", fake_sleep)
+
+    throttle = base_model_analyzer._RequestThrottle(requests_per_minute=0, tokens_per_minute=0)
+    for _ in range(3):
+        await throttle.acquire(10_000)
+    assert sleeps == []
+
+    throttle = base_model_analyzer._RequestThrottle(requests_per_minute=-1, tokens_per_minute=1000)
+    await throttle.acquire(600)
+    await throttle.acquire(600)
+    assert len(sleeps) == 1
+    assert sleeps[0] == pytest.approx(12.0, abs=0.1)
+
+    throttle = base_model_analyzer._RequestThrottle(requests_per_minute=60, tokens_per_minute=0)
+    await throttle.acquire(10_000)
+    assert throttle._available_requests == pytest.approx(59.0, abs=0.01)
+
+
+async def test_similar_prompts_reuse_semantically_cached_response(analyzer, monkeypatch):
+    """A near-identical prompt is served from the semantic cache when enabled"""
+    from app.core.semantic_cache import SemanticCache
+    from app.services import embeddings_service
+
+    calls = []
+    vectors = {"user": [1.0, 0.0, 0.0], "user!": [0.99, 0.01, 0.0], "other": [0.0, 1.0, 0.0]}
+
+    async def fake_embedding(text, use_cache=True):
+        return vectors[text]
+
+    async def fake_create(**kwargs):
+        calls.append(kwargs)
+        return _FakeStream('{"findings": [{"title": "Missing rate limit", "category": "API"}]}')
+
+    monkeypatch.setattr(embeddings_service.get_shared_embeddings_service(), "generate_embedding", fake_embedding)
+    monkeypatch.setattr(analyzer.client.chat.completions, "create", fake_create)
+    analyzer._semantic_cache = SemanticCache(dim=3, capacity=4, threshold=0.97)
+
+    first = await analyzer._analyze_with_llm("system", "user")
+    similar = await analyzer._analyze_with_llm("system", "user!")
+    other_system = await analyzer._analyze_with_llm("config system", "user!")
+    unrelated = await analyzer._analyze_with_llm("system", "other")
+
+    assert len(calls) == 3
+    assert [f.title for f in similar] == [f.title for f in first] == ["Missing rate limit"]
+    assert len(other_system) == len(unrelated) == 1
+
+
+async def test_http_client_keeps_sdk_defaults_and_closes(analyzer):
+    """The OpenAI client uses the SDK's httpx client sized to our concurrency and can be closed"""
+    from openai import DefaultAsyncHttpxClient
+
+    http_client = analyzer.client._client
+    assert isinstance(http_client, DefaultAsyncHttpxClient)
+    pool = http_client._transport._pool
+    assert pool._max_connections == analyzer.max_concurrent_requests
+    assert pool._max_keepalive_connections == analyzer.max_concurrent_requests
+
+    await analyzer.close()
+    assert http_client.is_closed
@@ -0,0 +1,17 @@
+from app.core.config import DEFAULT_CORS_ORIGINS, Settings
+
+
+def test_cors_origins_parsed_from_comma_separated_env(monkeypatch):
+    """BACKEND_CORS_ORIGINS accepts a comma-separated list"""
+    monkeypatch.setenv("BACKEND_CORS_ORIGINS", "https://a.example,https://b.example")
+
+    assert Settings().BACKEND_CORS_ORIGINS == ["https://a.example", "https://b.example"]
+
+
+def test_cors_origins_default_when_unset_or_empty(monkeypatch):
+    """An unset or empty BACKEND_CORS_ORIGINS falls back to the default origins"""
+    monkeypatch.delenv("BACKEND_CORS_ORIGINS", raising=False)
+    assert Settings().BACKEND_CORS_ORIGINS == list(DEFAULT_CORS_ORIGINS)
+
+    monkeypatch.setenv("BACKEND_CORS_ORIGINS", "")
+    assert Settings().BACKEND_CORS_ORIGINS == list(DEFAULT_CORS_ORIGINS)
@@ -0,0 +1,67 @@
+import asyncio
+import pytest
+from app.services.embeddings_service import EmbeddingBatcher
+
+
+class FakeEmbeddingsService:
+    """Records batch calls and returns one vector per text"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def generate_embeddings_batch(self, texts, use_cache=True):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+async def test_concurrent_requests_share_one_batch():
+    """Queries arriving within the window are embedded in a single call"""
+    service = FakeEmbeddingsService()
+    batcher = EmbeddingBatcher(service, max_batch=8, max_wait_ms=20)
+
+    results = await asyncio.gather(*(batcher.embed_coalesced(text) for text in ["a", "bb", "ccc"]))
+    await batcher.close()
+
+    assert service.calls == [["a", "bb", "ccc"]]
+    assert [r.tolist() for r in results] == [[1.0, 1.0], [2.0, 1.0], [3.0, 1.0]]
+
+
+async def test_batches_are_capped_at_max_batch():
+    """A burst larger than max_batch is split across model calls"""
+    service = FakeEmbeddingsService()
+    batcher = EmbeddingBatcher(service, max_batch=2, max_wait_ms=20)
+
+    await asyncio.gather(*(batcher.embed_coalesced(text) for text in ["a", "b", "c"]))
+    await batcher.close()
+
+    assert service.calls == [["a", "b"], ["c"]]
+
+
+async def test_errors_propagate_to_waiting_requests():
+    """A failed batch call raises for every request in the batch"""
+    class FailingService:
+        async def generate_embeddings_batch(self, texts, use_cache=True):
+            raise RuntimeError("model unavailable")
+
+    batcher = EmbeddingBatcher(FailingService(), max_wait_ms=5)
+
+    with pytest.raises(RuntimeError):
+        await batcher.embed_coalesced("query")
+    await batcher.close()
+
+
+async def test_short_batch_result_fails_instead_of_hanging():
+    """Callers fail fast when the service returns fewer vectors than texts"""
+    class ShortService(FakeEmbeddingsService):
+        async def generate_embeddings_batch(self, texts, use_cache=True):
+            return (await super().generate_embeddings_batch(texts))[:-1]
+
+    batcher = EmbeddingBatcher(ShortService(), max_batch=8, max_wait_ms=20)
+
+    results = await asyncio.wait_for(
+        asyncio.gather(*(batcher.embed_coalesced(text) for text in ["a", "bb"]), return_exceptions=True),
+        timeout=1
+    )
+    await batcher.close()
+
+    assert all(isinstance(r, RuntimeError) for r in results)
@@ -0,0 +1,90 @@
+import hashlib
+import numpy as np
+from app.services.embeddings_service import EmbeddingsService
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the Redis client"""
+
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def setex(self, key, ttl, value):
+        self.store[key] = value
+
+
+def test_embeddings_cached_as_float32_bytes_under_content_hash():
+    """Embeddings are keyed by model and SHA-256 and stored as raw float32"""
+    service = EmbeddingsService()
+    service.redis = FakeRedis()
+    service.redis_available = True
+
+    service._save_to_cache("prompt injection", np.array([0.25, -0.5, 1.0]))
+
+    key = f"emb:{EmbeddingsService.MODEL_ID}:{hashlib.sha256(b'prompt injection').hexdigest()}"
+    assert service.redis.store[key] == np.array([0.25, -0.5, 1.0], dtype=np.float32).tobytes()
+    assert service._get_from_cache("prompt injection") == [0.25, -0.5, 1.0]
+    assert service._get_from_cache("unseen query") is None
+
+
+def test_embedding_consumers_share_one_service():
+    """Search, assessment validation and the batcher all use the same loaded model"""
+    from app.api import dependencies
+    from app.core.finding_validator import FindingValidator
+    from app.services.embeddings_service import get_shared_embeddings_service
+
+    shared = get_shared_embeddings_service()
+
+    assert dependencies.get_embedding_service() is shared
+    assert dependencies.get_query_batcher().embeddings_service is shared
+    assert FindingValidator().embeddings_service is shared
+
+
+def test_quantized_backend_uses_separate_cache_namespace(monkeypatch):
+    """INT8 embeddings are never served for FP32 lookups and vice versa"""
+    from app.core import embeddings
+    from app.core.config import settings
+
+    service = EmbeddingsService()
+    fp32_key = service._cache_key("prompt injection")
+    monkeypatch.setattr(settings, "EMBEDDINGS_BACKEND", "onnx")
+
+    assert embeddings.model_cache_id() == f"{EmbeddingsService.MODEL_ID}-onnx-int8"
+    assert service._cache_key("prompt injection") != fp32_key
+
+
+def test_model_loading_pins_torch_threads(monkeypatch):
+    """EMBEDDING_NUM_THREADS limits torch intra-op parallelism when the model loads"""
+    from app.core import embeddings
+    from app.core.config import settings
+
+    threads = []
+    monkeypatch.setattr(settings, "EMBEDDING_NUM_THREADS", 2)
+    monkeypatch.setattr(embeddings.torch, "set_num_threads", threads.append)
+    monkeypatch.setattr(embeddings, "SentenceTransformer", lambda name, **kwargs: name)
+
+    assert embeddings.load_sentence_transformer() == embeddings.MODEL_NAME
+    assert threads == [2]
+
+
+async def test_batch_embeddings_grouped_by_length_keep_input_order():
+    """Texts are encoded in length-sorted batches but returned in input order"""
+    class FakeModel:
+        def __init__(self):
+            self.batches = []
+
+        def encode(self, texts, **kwargs):
+            self.batches.append(list(texts))
+            return np.array([[float(len(text))] for text in texts], dtype=np.float32)
+
+    service = EmbeddingsService()
+    service.model = FakeModel()
+    texts = ["x" * n for n in (40, 3, 25, 1, 17, 9, 33, 12, 2, 30, 6, 21, 15, 4, 28, 8, 19, 36)]
+
+    result = await service.generate_embeddings_batch(texts, use_cache=False)
+
+    assert result == [[float(len(text))] for text in texts]
+    assert service.model.batches[0] == sorted(texts, key=len)[:16]
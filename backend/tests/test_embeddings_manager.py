@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from app.core.embeddings import EmbeddingsManager
+
+
+class FakeModel:
+    """Encodes each known text to a fixed vector"""
+
+    VECTORS = {
+        "prompt injection": [1.0, 0.0, 0.0],
+        "nothing similar": [0.0, 0.0, 1.0],
+    }
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, text, convert_to_numpy=True):
+        self.calls.append(text)
+        return np.array(self.VECTORS[text], dtype=np.float32)
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr("app.core.embeddings.get_model", lambda: FakeModel())
+    return EmbeddingsManager()
+
+
+async def test_find_similar_patterns_ranks_matches(manager):
+    """Patterns above the threshold are returned best match first"""
+    patterns = {
+        "exact": [2.0, 0.0, 0.0],
+        "close": [0.9, 0.3, 0.0],
+        "unrelated": [0.0, 1.0, 0.0],
+        "zero": [0.0, 0.0, 0.0],
+    }
+
+    results = await manager.find_similar_patterns("prompt injection", patterns, threshold=0.7)
+
+    assert [r["pattern_id"] for r in results] == ["exact", "close"]
+    assert results[0]["similarity"] == pytest.approx(1.0)
+    assert results[1]["similarity"] == pytest.approx(manager.calculate_similarity([1.0, 0.0, 0.0], patterns["close"]))
+
+
+async def test_pattern_matrix_is_reused_until_patterns_change(manager):
+    """The normalized pattern matrix is built once per pattern mapping"""
+    patterns = {"exact": [1.0, 0.0, 0.0]}
+
+    await manager.find_similar_patterns("prompt injection", patterns)
+    matrix = manager._pattern_matrix
+    assert await manager.find_similar_patterns("nothing similar", patterns) == []
+    assert manager._pattern_matrix is matrix
+
+    patterns["other"] = [0.0, 0.0, 1.0]
+    results = await manager.find_similar_patterns("nothing similar", patterns)
+    assert [r["pattern_id"] for r in results] == ["other"]
+
+    patterns["exact"] = [0.0, 1.0, 0.0]
+    assert await manager.find_similar_patterns("prompt injection", patterns) == []
+
+
+async def test_repeated_texts_are_encoded_once(manager):
+    """Embeddings are memoized per text and callers get independent lists"""
+    first = await manager.create_embedding("prompt injection")
+    first.append(99.0)
+    second = await manager.create_embedding("prompt injection")
+    await manager.find_similar_patterns("prompt injection", {"exact": [1.0, 0.0, 0.0]})
+
+    assert second == [1.0, 0.0, 0.0]
+    assert manager.model.calls == ["prompt injection"]
@@ -0,0 +1,198 @@
+from collections import OrderedDict
+import asyncio
+import numpy as np
+import pytest
+from app.core import finding_validator
+from app.core.finding_validator import FindingValidator
+from app.core.knowledge_base import KnowledgeBase
+from app.schemas.assessment import VulnerabilityFinding
+
+
+class FakeEmbeddingsService:
+    """Returns fixed embeddings for known texts"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.calls = []
+
+    async def initialize(self):
+        pass
+
+    async def generate_embeddings_batch(self, texts, use_cache=True):
+        self.calls.append(list(texts))
+        await asyncio.sleep(0)
+        return [self.vectors[text] for text in texts]
+
+
+def _finding(title, confidence=0.8):
+    return VulnerabilityFinding(
+        id=title,
+        title=title,
+        description="",
+        severity="HIGH",
+        category="PROMPT_SECURITY",
+        recommendation="Fix it",
+        confidence=confidence
+    )
+
+
+@pytest.fixture
+def validator(monkeypatch):
+    monkeypatch.setattr(finding_validator, "_GLOBAL_EMBEDDING_CACHE", OrderedDict())
+    monkeypatch.setattr(finding_validator, "_FINDING_EMBEDDING_CACHE", OrderedDict())
+    vectors = {
+        "Prompt injection vulnerability in AI systems": [1.0, 0.0, 0.0],
+        "Missing rate limiting and hardcoded API keys": [0.0, 1.0, 0.0],
+        "Insecure AI model configuration settings": [0.0, 0.0, 1.0],
+        "Poor error handling in AI systems": [0.0, -1.0, 0.0],
+        "Injected prompt. ": [2.0, 0.2, 0.0],
+        "Loose rate limits. ": [0.1, 0.5, 0.5],
+        "Unrelated. ": [-1.0, 0.0, 0.0],
+        "Empty. ": [0.0, 0.0, 0.0],
+    }
+    return FindingValidator(knowledge_base=KnowledgeBase(), embeddings_service=FakeEmbeddingsService(vectors))
+
+
+async def test_validate_findings_matches_most_similar_vulnerability(validator):
+    """Each finding is scored against its closest known vulnerability"""
+    findings = [_finding("Injected prompt"), _finding("Loose rate limits"), _finding("Unrelated"), _finding("Empty")]
+
+    validated = await validator.validate_findings(findings)
+
+    infos = [f.validation_info for f in validated]
+    assert infos[0]["similar_vulnerability"] == "Prompt injection vulnerability in AI systems"
+    assert infos[0]["validation_score"] == pytest.approx(2.0 / np.hypot(2.0, 0.2))
+    assert infos[0]["confidence_adjustment"] == "boosted"
+    assert validated[0].confidence == pytest.approx(0.95)
+
+    # Ties go to the first known vulnerability, as with a sequential scan
+    assert infos[1]["similar_vulnerability"] == "Missing rate limiting and hardcoded API keys"
+    assert infos[1]["validation_score"] == pytest.approx(0.5 / np.sqrt(0.51))
+
+    # No positive similarity means no match
+    for info in infos[2:]:
+        assert info["similar_vulnerability"] is None
+        assert info["validation_score"] == 0
+        assert info["confidence_adjustment"] == "reduced"
+
+
+async def test_cached_vulnerability_embeddings_are_normalized(validator):
+    """Known vulnerability embeddings are stored once as unit-length float32 vectors"""
+    await validator.initialize()
+
+    for embedding in validator._vulnerability_embeddings.values():
+        assert embedding.dtype == np.float32
+        assert np.linalg.norm(embedding) == pytest.approx(1.0)
+    assert validator._calculate_similarity([2.0, 0.0], [1.0, 1.0]) == pytest.approx(np.sqrt(0.5))
+    assert validator._calculate_similarity([0.0, 0.0], [1.0, 1.0]) == 0
+    assert validator._calculate_similarity([], [1.0]) == 0
+
+
+def test_embedding_cache_evicts_oldest_entry(validator, monkeypatch):
+    """Storing past the limit evicts one entry at a time, oldest first"""
+    monkeypatch.setattr(finding_validator, "_MAX_CACHE_ENTRIES", 2)
+
+    validator._cache_embedding("a", np.ones(3, dtype=np.float32))
+    validator._cache_embedding("b", np.ones(3, dtype=np.float32))
+    validator._cache_embedding("a", np.zeros(3, dtype=np.float32))
+    validator._cache_embedding("c", np.ones(3, dtype=np.float32))
+
+    assert list(validator._vulnerability_embeddings) == ["a", "c"]
+    assert not validator._vulnerability_embeddings["a"].any()
+
+
+async def test_fast_mode_counts_category_keywords(validator):
+    """Fast mode adjusts confidence by keyword matches across title and description"""
+    findings = [
+        _finding("Prompt injection via user input"),
+        _finding("Prompt"),
+        _finding("Hardcoded secret"),
+    ]
+    findings[2].category = "GENERAL_SECURITY"
+
+    validated = await validator.validate_findings(findings, fast_mode=True)
+
+    assert [f.validation_info["confidence_adjustment"] for f in validated] == ["boosted", "keyword_based", "unchanged"]
+    assert validated[0].validation_info["validation_score"] == pytest.approx(3 / 5)
+    assert validated[0].confidence == pytest.approx(0.9)
+
+
+async def test_validated_findings_are_copies(validator):
+    """Validation returns updated copies and leaves the input findings untouched"""
+    finding = _finding("Injected prompt")
+    finding.code_snippets = ["prompt = user_input"]
+    unknown = [_finding("First"), _finding("Second")]
+    for f in unknown:
+        f.category = "GENERAL_SECURITY"
+
+    validated = (await validator.validate_findings([finding]))[0]
+    fast = await validator.validate_findings(unknown, fast_mode=True)
+
+    assert finding.validation_info is None and finding.confidence == 0.8
+    assert validated.confidence == pytest.approx(0.95)
+    assert validated.code_snippets == ["prompt = user_input"]
+    assert validated.severity_code == finding.severity_code
+    assert fast[0].validation_info == fast[1].validation_info
+    assert fast[0].validation_info is not fast[1].validation_info
+
+
+async def test_finding_embeddings_are_reused_across_validations(validator):
+    """Previously embedded finding texts skip the embeddings service"""
+    await validator.validate_findings([_finding("Injected prompt"), _finding("Empty")])
+    first = await validator.validate_findings([_finding("Injected prompt")])
+    second = await validator.validate_findings([_finding("Empty"), _finding("Loose rate limits")])
+
+    # The zero "Empty" embedding is a failure fallback, so it is embedded again
+    calls = validator.embeddings_service.calls
+    assert len(calls) == 2
+    assert calls[0][-2:] == ["Injected prompt. ", "Empty. "]
+    assert calls[1] == ["Empty. ", "Loose rate limits. "]
+    assert first[0].validation_info["similar_vulnerability"] == "Prompt injection vulnerability in AI systems"
+    assert second[0].validation_info["similar_vulnerability"] is None
+
+
+async def test_cold_start_embeds_vulnerability_types_with_findings(validator):
+    """Without initialize(), the known types and the findings share one embeddings call"""
+    validated = await validator.validate_findings([_finding("Injected prompt")])
+
+    assert len(validator.embeddings_service.calls) == 1
+    assert validator.embeddings_service.calls[0][-1] == "Injected prompt. "
+    assert len(validator._vulnerability_embeddings) == 4
+    assert validated[0].validation_info["similar_vulnerability"] == "Prompt injection vulnerability in AI systems"
+
+
+async def test_concurrent_cold_starts_embed_vulnerability_types_once(validator):
+    """Concurrent first validations share a single embedding of the known types"""
+    await asyncio.gather(
+        validator.validate_findings([_finding("Injected prompt")]),
+        validator.validate_findings([_finding("Loose rate limits")]),
+        validator.initialize(),
+    )
+
+    calls = validator.embeddings_service.calls
+    assert sum("Poor error handling in AI systems" in call for call in calls) == 1
+    assert not validator._vuln_matrix.flags.writeable
+
+
+async def test_fast_validation_is_available_synchronously(validator):
+    """Keyword validation can be called without awaiting and matches fast_mode"""
+    findings = [_finding("Prompt injection via user input"), _finding("Hardcoded secret")]
+
+    fast = validator.validate_findings_fast(findings)
+    awaited = await validator.validate_findings(findings, fast_mode=True)
+
+    assert [f.model_dump() for f in fast] == [f.model_dump() for f in awaited]
+    assert validator.embeddings_service.calls == []
+
+
+def test_knowledge_base_is_created_lazily():
+    """A default knowledge base is only built when something uses it"""
+    provided = KnowledgeBase()
+    service = FakeEmbeddingsService({})
+
+    assert FindingValidator(knowledge_base=provided, embeddings_service=service).knowledge_base is provided
+
+    validator = FindingValidator(embeddings_service=service)
+    assert "knowledge_base" not in vars(validator)
+    assert isinstance(validator.knowledge_base, KnowledgeBase)
+    assert validator.knowledge_base is validator.knowledge_base
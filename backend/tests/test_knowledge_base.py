@@ -95,4 +95,113 @@ async def test_pattern_categories(knowledge_base):
     for category in categories:
         patterns = knowledge_base.get_patterns_by_category(category)
         assert len(patterns) > 0, f"Should have patterns for category {category}"
-        assert all(p.category == category for p in patterns), "All patterns should match the requested category" 
\ No newline at end of file
+        assert all(p.category == category for p in patterns), "All patterns should match the requested category" 
+@pytest.mark.asyncio
+async def test_failing_source_does_not_block_others(knowledge_base, tmp_path):
+    """Test that one unreadable source is logged while the remaining sources still load."""
+    knowledge_base.patterns_file = str(tmp_path / "security_patterns.json")
+    knowledge_base.sources = {"missing": str(tmp_path / "missing.md"), **knowledge_base.sources}
+    await knowledge_base._load_external_patterns()
+
+    assert knowledge_base.get_patterns_by_source("missing") == []
+    assert len(knowledge_base.get_patterns_by_source("owasp_ai")) > 0, "Other sources should still be loaded"
+    assert len(knowledge_base.get_patterns_by_source("mitre_matrix")) > 0, "Other sources should still be loaded"
+
+@pytest.mark.asyncio
+async def test_http_session_is_shared_until_closed():
+    """Test that refreshes reuse one pooled HTTP session until shutdown closes it."""
+    from app.core import knowledge_base as kb_module
+
+    first = await kb_module._get_session()
+    assert await kb_module._get_session() is first
+
+    await kb_module.close_session()
+    assert first.closed
+    assert kb_module._session is None
+
+@pytest.mark.asyncio
+async def test_unchanged_sources_are_not_reparsed(knowledge_base, monkeypatch):
+    """Test that refreshing with identical source content reuses the previous parse."""
+    await knowledge_base._load_external_patterns()
+    first = dict(knowledge_base.patterns)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("unchanged source should not be parsed again")
+
+    monkeypatch.setattr(knowledge_base, "_extract_patterns_from_markdown", fail)
+    monkeypatch.setattr(knowledge_base, "_extract_patterns_from_yaml", fail)
+    knowledge_base.patterns = {}
+    await knowledge_base._load_external_patterns()
+
+    assert knowledge_base.patterns == first
+
+def test_save_reuses_serialized_patterns(knowledge_base, tmp_path, monkeypatch):
+    """Test that saving only re-serializes patterns that were added or replaced."""
+    knowledge_base.patterns_file = str(tmp_path / "security_patterns.json")
+    make = lambda i: SecurityPattern(id=f"p{i}", category="Test", description=f"Pattern {i}", source="test")
+    knowledge_base.add_pattern(make(1))
+    knowledge_base.add_pattern(make(2))
+
+    dumped = []
+    original_dump = SecurityPattern.model_dump
+    def tracking_dump(self, *args, **kwargs):
+        dumped.append(self.id)
+        return original_dump(self, *args, **kwargs)
+    monkeypatch.setattr(SecurityPattern, "model_dump", tracking_dump)
+
+    knowledge_base.add_pattern(make(3))
+    assert dumped == ["p3"]
+
+    saved = json.loads(Path(knowledge_base.patterns_file).read_text())
+    assert [p["id"] for p in saved] == ["p1", "p2", "p3"]
+
+def test_replacing_pattern_moves_it_between_buckets(knowledge_base, tmp_path):
+    """Test that category and source lookups follow a pattern that is re-added with new values."""
+    knowledge_base.patterns_file = str(tmp_path / "security_patterns.json")
+    knowledge_base.add_pattern(SecurityPattern(id="p1", category="Old", description="d", source="a"))
+    knowledge_base.add_pattern(SecurityPattern(id="p2", category="Old", description="d", source="a"))
+    knowledge_base.add_pattern(SecurityPattern(id="p1", category="New", description="d", source="b"))
+
+    assert [p.id for p in knowledge_base.get_patterns_by_category("Old")] == ["p2"]
+    assert [p.id for p in knowledge_base.get_patterns_by_category("New")] == ["p1"]
+    assert [p.id for p in knowledge_base.get_patterns_by_source("b")] == ["p1"]
+
+    knowledge_base.patterns = {}
+    assert knowledge_base.get_patterns_by_category("Old") == []
+
+@pytest.mark.asyncio
+async def test_unmodified_remote_source_uses_cached_copy(knowledge_base, tmp_path, monkeypatch):
+    """Test that remote sources are revalidated with their ETag and served from disk on 304."""
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+    from app.core import knowledge_base as kb_module
+
+    markdown = Path(knowledge_base.sources["owasp_ai"]).read_text()
+    seen_etags = []
+
+    async def handler(request):
+        seen_etags.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.Response(text=markdown, headers={"ETag": '"v1"'})
+
+    app = web.Application()
+    app.router.add_get("/security_patterns.md", handler)
+    monkeypatch.setattr(kb_module, "_session", None)
+
+    async with TestServer(app) as server:
+        knowledge_base.test_mode = False
+        knowledge_base.source_cache_dir = tmp_path / "sources"
+        knowledge_base.sources = {"owasp_ai": str(server.make_url("/security_patterns.md"))}
+        try:
+            await knowledge_base._load_external_patterns()
+            first = knowledge_base.get_patterns_by_source("owasp_ai")
+
+            knowledge_base.patterns = {}
+            await knowledge_base._load_external_patterns()
+        finally:
+            await kb_module.close_session()
+
+    assert seen_etags == [None, '"v1"']
+    assert len(first) > 0
+    assert [p.id for p in knowledge_base.get_patterns_by_source("owasp_ai")] == [p.id for p in first]
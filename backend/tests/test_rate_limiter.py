@@ -0,0 +1,24 @@
+from app.core import rate_limiter
+from app.core.config import settings
+
+
+def test_limiters_are_shared_per_limit(monkeypatch):
+    """Endpoints with the same limit share one RateLimiter instance"""
+    monkeypatch.setattr(settings, "ENVIRONMENT", "production")
+
+    first = rate_limiter.rate_limit(requests=5, period=60)
+    second = rate_limiter.rate_limit(requests=5, period=60)
+    other = rate_limiter.rate_limit(requests=20, period=60)
+
+    assert first.dependency is second.dependency
+    assert first.dependency is not other.dependency
+    assert first.dependency.times == 5
+
+
+async def test_development_uses_noop_dependency(monkeypatch):
+    """Rate limiting resolves to a no-op dependency in development"""
+    monkeypatch.setattr(settings, "ENVIRONMENT", "development")
+
+    dependency = rate_limiter.rate_limit(requests=5, period=60)
+
+    assert await dependency.dependency() is None
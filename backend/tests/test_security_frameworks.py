@@ -0,0 +1,56 @@
+import json
+import pytest
+from app.core.security_frameworks import SecurityFrameworkManager
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """Framework manager reading its cache files from a temporary directory"""
+    monkeypatch.chdir(tmp_path)
+    return SecurityFrameworkManager()
+
+
+def _write_cache(manager, name, patterns):
+    with open(manager.cache_dir / f"{name}_patterns.json", "w") as f:
+        json.dump(patterns, f)
+
+
+@pytest.mark.asyncio
+async def test_framework_mapping_uses_loaded_indexes(manager):
+    """Mappings resolve from the per-framework indexes built at load time"""
+    _write_cache(manager, "owasp", {
+        "LLM01": {"id": "prompt_injection", "owasp_id": "LLM01"},
+        "LLM01-dup": {"id": "prompt_injection", "owasp_id": "LLM99"},
+    })
+    _write_cache(manager, "cwe", {"CWE-77": {"id": "prompt_injection", "cwe_id": "CWE-77"}})
+    await manager.initialize()
+
+    mapping = manager.get_framework_mapping("prompt_injection")
+
+    assert mapping.owasp_id == "LLM01"
+    assert mapping.cwe_id == "CWE-77"
+    assert mapping.mitre_attack_id is None
+    assert manager.get_framework_mapping("unknown") is None
+
+
+@pytest.mark.asyncio
+async def test_refresh_rebuilds_indexes(manager):
+    """Refreshing picks up cache files written after the first load"""
+    await manager.initialize()
+    assert manager.get_framework_mapping("model_theft") is None
+
+    _write_cache(manager, "mitre", {"AML.T0024": {"id": "model_theft", "mitre_id": "AML.T0024"}})
+    await manager.refresh_frameworks()
+
+    assert manager.get_framework_mapping("model_theft").mitre_attack_id == "AML.T0024"
+
+
+@pytest.mark.asyncio
+async def test_unreadable_cache_file_resets_all_frameworks(manager):
+    """A corrupt cache file falls back to empty patterns for every framework"""
+    _write_cache(manager, "owasp", {"LLM01": {"id": "prompt_injection", "owasp_id": "LLM01"}})
+    (manager.cache_dir / "nist_patterns.json").write_text("{not json")
+    await manager.initialize()
+
+    assert manager.owasp_patterns == {}
+    assert manager.get_framework_mapping("prompt_injection") is None
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from app.core.semantic_cache import SemanticCache
+
+
+def test_returns_result_for_similar_embedding():
+    """Near-identical embeddings should hit the cache"""
+    cache = SemanticCache(dim=3, capacity=4, threshold=0.95)
+    cache.put([1.0, 0.0, 0.0], ["finding-1"])
+
+    assert cache.get([0.99, 0.05, 0.0]) == ["finding-1"]
+    assert cache.get([0.0, 1.0, 0.0]) is None
+
+
+def test_evicts_least_recently_used_entry():
+    """A full cache should replace the entry that was used longest ago"""
+    cache = SemanticCache(dim=3, capacity=2, threshold=0.95)
+    cache.put([1.0, 0.0, 0.0], "x")
+    cache.put([0.0, 1.0, 0.0], "y")
+
+    # Touch "x" so that "y" becomes the eviction candidate
+    assert cache.get([1.0, 0.0, 0.0]) == "x"
+    cache.put([0.0, 0.0, 1.0], "z")
+
+    assert len(cache) == 2
+    assert cache.get([1.0, 0.0, 0.0]) == "x"
+    assert cache.get([0.0, 1.0, 0.0]) is None
+    assert cache.get(np.array([0.0, 0.0, 1.0])) == "z"
+
+
+def test_ignores_invalid_embeddings():
+    """Zero vectors and wrong dimensions are never cached"""
+    cache = SemanticCache(dim=3, capacity=2)
+    cache.put([0.0, 0.0, 0.0], "zero")
+    cache.put([1.0, 0.0], "short")
+
+    assert len(cache) == 0
+    assert cache.get([1.0, 0.0, 0.0]) is None
+
+
+def test_quantized_cache_matches_float_lookups():
+    """int8 storage should give the same hits and misses as float32"""
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(8, 384)).astype(np.float32)
+    cache = SemanticCache(dim=384, capacity=8, threshold=0.95, quantize=True)
+    for i, vector in enumerate(vectors):
+        cache.put(vector, i)
+
+    assert cache._embeddings.dtype == np.int8
+    for i, vector in enumerate(vectors):
+        noisy = vector + rng.normal(scale=0.05, size=384).astype(np.float32)
+        assert cache.get(noisy) == i
+    assert cache.get(rng.normal(size=384)) is None
+
+
+def test_near_duplicate_put_replaces_entry():
+    """Storing a near-identical embedding refreshes the existing entry instead of adding one"""
+    cache = SemanticCache(dim=3, capacity=4, threshold=0.95)
+    cache.put([1.0, 0.0, 0.0], "old")
+    cache.put([0.99, 0.05, 0.0], "new")
+
+    assert len(cache) == 1
+    assert cache.get([1.0, 0.0, 0.0]) == "new"
+
+
+def test_rejects_empty_capacity():
+    """A cache needs at least one slot to store results"""
+    with pytest.raises(ValueError):
+        SemanticCache(dim=3, capacity=0)
@@ -2,6 +2,8 @@ import pytest
 from app.services.vector_store import VectorStore
 from datetime import datetime
 import numpy as np
+from app.core import vector_store_singleton
+from app.core.config import settings
 
 @pytest.fixture
 def vector_store():
@@ -71,4 +73,22 @@ async def test_delete_documents(vector_store, sample_documents):
 async def test_empty_documents(vector_store):
     """Test handling of empty document list"""
     result = await vector_store.store_documents([])
-    assert result is True 
\ No newline at end of file
+    assert result is True 
+
+@pytest.mark.asyncio
+async def test_init_vector_store_uses_configured_search_ef(monkeypatch):
+    """The startup hook builds the shared store with the configured HNSW ef"""
+    created = {}
+
+    class FakeVectorStore:
+        def __init__(self, **kwargs):
+            created.update(kwargs)
+
+    monkeypatch.setattr(vector_store_singleton, "VectorStore", FakeVectorStore)
+    monkeypatch.setattr(vector_store_singleton, "vector_store", None)
+    monkeypatch.setattr(settings, "VECTOR_SEARCH_HNSW_EF", 256)
+
+    await vector_store_singleton.init_vector_store()
+
+    assert isinstance(vector_store_singleton.get_vector_store(), FakeVectorStore)
+    assert created["hnsw_ef"] == 256